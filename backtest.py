@@ -0,0 +1,199 @@
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from base import Product, Rest, Trade
+from recorder import Recording
+from settlement import MarketMakerModel
+
+RECORDED_BOT = "recorded"
+
+
+class Backtester:
+    """
+    Replays a recorded book (a Recording from recorder.py, or a CSV loaded with book_data.load_book_csv) through a
+    bot without the NPC bots, so signal logic can be iterated on in seconds rather than a full run_game.
+
+    Each timestep the bot's send_messages gets the recorded levels as Rest lists (plus its own resting orders), in
+    the usual {ticker: {"Bids": [...], "Asks": [...]}} layout. Its orders:
+    - trade immediately against recorded levels they cross, up to the recorded size at each level
+    - otherwise rest, and fill at their own price once a later recorded book trades through them
+    Fills are sent back through process_trades as Trades against RECORDED_BOT.
+
+    The recording does not react to the bot, so market impact comes from the market maker model in the README: the
+    mid fades linearly with the size the bot has traded, fade = mm_spacing / mm_level_size per unit (20 size every 1.0
+    in the current game), and every later recorded price is shifted by that much. At the end the position is settled
+    by trading it against the faded market maker (settlement.py). CSV recordings have no sizes, so default_size is
+    used per level.
+    """
+    def __init__(self, recording: Recording, products: List[Product], market: int = None,
+                 mm_level_size: int = 20, mm_spacing: float = 1.0, mm_width: float = 4.0, default_size: int = 20):
+        self.products = products
+        self.mm = MarketMakerModel(mm_level_size, mm_spacing, mm_width)
+        self.fade = self.mm.fade
+        self.books = {}  # ticker → (bid_price, bid_size, ask_price, ask_size), each a list of per-timestep levels
+        for product in products:
+            cols = recording.select(product.ticker if product.ticker in recording.tickers else None, market)
+            sizes_known = recording.meta.get("sizes_known", True)
+            arrays = []
+            for price_name, size_name in (("bid_price", "bid_size"), ("ask_price", "ask_size")):
+                prices = np.asarray(cols[price_name], dtype=np.float64).reshape(len(cols[price_name]), -1)
+                sizes = np.asarray(cols[size_name], dtype=np.int64).reshape(prices.shape)
+                if not sizes_known:
+                    sizes = np.where(np.isnan(prices), 0, default_size)
+                arrays += [prices.tolist(), sizes.tolist()]  # plain lists are much quicker to step through
+            self.books[product.ticker] = tuple(arrays)
+        self.num_timestamps = min(len(book[0]) for book in self.books.values())
+
+    def run(self, bot, num_timestamps: int = None) -> Dict:
+        """
+        Plays the bot through the recording and returns its pnl (Cash), positions, fines, settled pnl and timings
+        """
+        num_timestamps = min(num_timestamps or self.num_timestamps, self.num_timestamps)
+        name = bot.name
+        limits = {p.ticker: (p.pos_limit, p.fine) for p in self.products if p.pos_limit is not None}
+        positions = {ticker: 0 for ticker in self.books}
+        cash = 0.0
+        fines = 0
+        num_trades = 0
+        resting = {ticker: {} for ticker in self.books}  # ticker → order_id → Rest for our orders still resting
+        last_mid = {ticker: np.nan for ticker in self.books}
+
+        start = time.perf_counter()
+        for t in range(num_timestamps):
+            book = {}
+            levels = {}  # ticker → ([price, size] bids, [price, size] asks) left for the bot to trade against
+            trades = []
+            for ticker, (bid_px, bid_sz, ask_px, ask_sz) in self.books.items():
+                offset = self.fade * positions[ticker]
+                bids = [[p + offset, s] for p, s in zip(bid_px[t], bid_sz[t]) if s > 0 and p == p]
+                asks = [[p + offset, s] for p, s in zip(ask_px[t], ask_sz[t]) if s > 0 and p == p]
+                if bids and asks:
+                    last_mid[ticker] = (bids[0][0] + asks[0][0]) / 2
+                trades += self._fill_resting(ticker, resting[ticker], bids, asks, name)
+                levels[ticker] = (bids, asks)
+                book[ticker] = {"Bids": self._side(ticker, bids, resting[ticker], 1),
+                                "Asks": self._side(ticker, asks, resting[ticker], -1)}
+            if trades:
+                cash, num_trades = self._deliver(bot, trades, positions, cash, num_trades, name)
+
+            trades = []
+            for msg in bot.send_messages(book) or []:
+                if msg.msg_type == "REMOVE":
+                    for orders in resting.values():
+                        orders.pop(msg.message, None)
+                elif msg.msg_type == "ORDER":
+                    trades += self._match(msg.message, levels[msg.message.ticker], resting[msg.message.ticker], name)
+            if trades:
+                cash, num_trades = self._deliver(bot, trades, positions, cash, num_trades, name)
+
+            for ticker, (limit, fine) in limits.items():
+                over = abs(positions[ticker]) - limit
+                if over > 0:
+                    fines += over * fine
+
+        settled = cash + sum(self.mm.settlement_value(positions[ticker], last_mid[ticker]) for ticker in positions)
+        return {
+            "pnl": cash,
+            "positions": dict(positions),
+            "fines": fines,
+            "settled_pnl": settled - fines,
+            "trades": num_trades,
+            "timestamps": num_timestamps,
+            "time": time.perf_counter() - start,
+        }
+
+    def _side(self, ticker: str, levels, resting: Dict, direction: int) -> List[Rest]:
+        side = [Rest(size, price, "Buy" if direction == 1 else "Sell", -1, ticker, price * direction, RECORDED_BOT)
+                for price, size in levels if size > 0]
+        own = [rest for rest in resting.values() if rest.direction == direction]
+        if own:
+            side += own
+            side.sort(key=lambda rest: -rest.aggness)  # stable, so recorded size keeps priority at equal prices
+        return side
+
+    def _fill_resting(self, ticker: str, resting: Dict, bids, asks, name: str) -> List[Trade]:
+        """
+        Fills our resting orders that this timestep's recorded book has traded through, at our own price. The recorded
+        levels ([price, size] lists) are used up as they fill, best-priced orders first, so the same liquidity is
+        never filled twice, here or by _match later in the timestep
+        """
+        trades = []
+        if not resting:
+            return trades
+        for order_id, rest in sorted(resting.items(), key=lambda item: -item[1].aggness):
+            opposing = asks if rest.direction == 1 else bids
+            size = 0
+            for level in opposing:
+                if size == rest.size:
+                    break
+                if (level[0] > rest.price) if rest.direction == 1 else (level[0] < rest.price):
+                    break
+                taken = min(rest.size - size, level[1])
+                size += taken
+                level[1] -= taken
+            if size == 0:
+                continue
+            trades.append(Trade(rest.price, size, ticker, -1, order_id, "Sell" if rest.direction == 1 else "Buy",
+                                RECORDED_BOT, name))
+            rest.size -= size
+            if rest.size == 0:
+                del resting[order_id]
+        return trades
+
+    def _match(self, order, levels, resting: Dict, name: str) -> List[Trade]:
+        """
+        Trades an incoming order against this timestep's recorded levels ([price, size] lists, used up as they fill)
+        and rests what is left
+        """
+        trades = []
+        opposing = levels[1] if order.direction == 1 else levels[0]
+        for level in opposing:
+            if order.size == 0:
+                break
+            price, size = level
+            if (price > order.price) if order.direction == 1 else (price < order.price):
+                break
+            trade_size = min(order.size, size)
+            if trade_size <= 0:
+                continue
+            trades.append(Trade(price, trade_size, order.ticker, order.order_id, -1, order.agg_dir, name,
+                                RECORDED_BOT))
+            order.size -= trade_size
+            level[1] -= trade_size
+        if order.size > 0:
+            resting[order.order_id] = Rest(order.size, order.price, order.agg_dir, order.order_id, order.ticker,
+                                           order.aggness, order.bot_name)
+        return trades
+
+    @staticmethod
+    def _deliver(bot, trades: List[Trade], positions: Dict, cash: float, num_trades: int, name: str):
+        for trade in trades:
+            sign = trade.direction if trade.agg_bot == name else -trade.direction
+            positions[trade.ticker] += trade.size * sign
+            cash -= trade.size * trade.price * sign
+        bot.process_trades(trades)
+        return cash, num_trades + len(trades)
+
+
+if __name__ == "__main__":
+    from book_data import load_book_csv
+    from play_game import make_products
+    from recorder import open_recording
+    from your_algo import PlayerAlgorithm
+
+    parser = argparse.ArgumentParser(description="Replay a recorded book through PlayerAlgorithm")
+    parser.add_argument("source", help="a BookRecorder folder or a Prices.csv-style CSV")
+    parser.add_argument("--market", type=int, default=None, help="which market of a multi-market CSV to replay")
+    parser.add_argument("--timestamps", type=int, default=None)
+    args = parser.parse_args()
+
+    recording = load_book_csv(args.source) if args.source.endswith(".csv") else open_recording(args.source)
+    market = args.market if args.market is not None else int(recording.markets()[0])
+    products = make_products()
+    result = Backtester(recording, products, market=market).run(PlayerAlgorithm(products), args.timestamps)
+    print(f"PnL {result['pnl']:.2f}, positions {result['positions']}, fines {result['fines']}, "
+          f"settled PnL {result['settled_pnl']:.2f}, {result['trades']} trades over {result['timestamps']} "
+          f"timestamps in {result['time']:.2f}s")
@@ -1,20 +1,32 @@
 from typing import List
 from time import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from conversions import ConversionEngine
+from trade_log import TradeLog
+
+
+DIRECTIONS = {"Buy": 1, "Sell": -1}  # shared by every Order/Trade/Rest, which store their direction as this int
+DIRECTION_NAMES = {1: "Buy", -1: "Sell"}
 
 
 class Msg:
+    __slots__ = ("msg_type", "message")
+
     def __init__(self, msg_type, message):
         self.msg_type = msg_type
         self.message = message
 
 class Order:
     """
-    Order object containing a limit order with a. self.agg_dir is just the direction of the order
+    Order object containing a limit order with a. self.agg_dir is just the direction of the order, stored as the int
+    self.direction (1 for Buy, -1 for Sell)
     """
+    __slots__ = ("ticker", "price", "size", "order_id", "direction", "bot_name", "aggness")
+    mapping = DIRECTIONS
 
     def __init__(self, ticker: str, price: float, size: int, order_id: int, agg_dir: str, bot_name: str):
 
-        self.mapping = {"Buy": 1, "Sell": -1}
         if agg_dir not in self.mapping:
             raise ValueError(f"Invalid agg_dir: {agg_dir}. Must be 'Buy' or 'Sell'.")
 
@@ -27,9 +39,17 @@ class Order:
         self.price = price
         self.size = size
         self.order_id = order_id # An order needs to be sent with a unique integer value order id. More details in PlayerAlgorithm
-        self.agg_dir = agg_dir
+        self.direction = self.mapping[agg_dir]
         self.bot_name = bot_name
-        self.aggness = self.price * self.mapping[self.agg_dir]
+        self.aggness = self.price * self.direction
+
+    @property
+    def agg_dir(self) -> str:
+        return DIRECTION_NAMES[self.direction]
+
+    @agg_dir.setter
+    def agg_dir(self, agg_dir: str):
+        self.direction = self.mapping[agg_dir]
 
     def __str__(self):
         return f'{self.bot_name} wants to {self.agg_dir} at {self.price}' # Feel free to play with this if you want to
@@ -38,7 +58,15 @@ class Order:
 class Trade:
     """
     Trade object for record-keeping executed trades.
+
+    Wall-clock timestamps are opt-in: set Trade.record_time = True before a game to have trade_time filled with
+    time(), otherwise it is None
     """
+    __slots__ = ("ticker", "price", "size", "agg_order_id", "direction", "rest_order_id", "trade_time",
+                 "agg_bot", "rest_bot")
+    mapping = DIRECTIONS
+    record_time = False
+
     def __init__(self, price: float, size: int, ticker: str,
                  agg_order_id: int, rest_order_id: int,
                  agg_dir: str, agg_bot: str, rest_bot: str):
@@ -46,12 +74,20 @@ class Trade:
         self.price = price
         self.size = size
         self.agg_order_id = agg_order_id
-        self.agg_dir = agg_dir
+        self.direction = self.mapping[agg_dir]
         self.rest_order_id = rest_order_id
-        self.trade_time = time()
+        self.trade_time = time() if self.record_time else None
         self.agg_bot = agg_bot # bot names not the bot object itself
         self.rest_bot = rest_bot
 
+    @property
+    def agg_dir(self) -> str:
+        return DIRECTION_NAMES[self.direction]
+
+    @agg_dir.setter
+    def agg_dir(self, agg_dir: str):
+        self.direction = self.mapping[agg_dir]
+
     def __str__(self):
         return f'{self.ticker} traded at {self.price}' # Feel free to play with this if you want to
 
@@ -82,68 +118,509 @@ class Rest:
     """
     Resting order in the order book.
     """
+    __slots__ = ("size", "direction", "price", "order_id", "ticker", "aggness", "bot_name", "queue_pos")
+    mapping = DIRECTIONS
+
     def __init__(self, size: int, price: float, dir, order_id: int,
                  ticker: str, aggness: float, bot_name: str):
         self.size = size
-        self.rest_dir = dir
+        self.direction = self.mapping[dir]
         self.price = price
         self.order_id = order_id
         self.ticker = ticker
         self.aggness = aggness
         self.bot_name = bot_name
+        self.queue_pos = 0  # position in its PriceLevel's queue, set when it starts resting
+
+    @property
+    def rest_dir(self) -> str:
+        return DIRECTION_NAMES[self.direction]
+
+    @rest_dir.setter
+    def rest_dir(self, rest_dir: str):
+        self.direction = self.mapping[rest_dir]
 
     def __str__(self):
         return f"Price: {self.price}, Size: {self.size}"
 
 
+class BookDelta:
+    """
+    One change to a book, numbered by seq in the order the exchange made them:
+    - "ADD": an order started resting, size is its size
+    - "CANCEL": a resting order was removed, size is what it had left
+    - "FILL": a resting order traded, size is the traded size (remaining is what is left resting, 0 once it is gone)
+    """
+    __slots__ = ("seq", "kind", "ticker", "side", "order_id", "price", "size", "remaining", "bot_name")
+
+    def __init__(self, seq: int, kind: str, rest: "Rest", size: int, remaining: int):
+        self.seq = seq
+        self.kind = kind
+        self.ticker = rest.ticker
+        self.side = "Bids" if rest.direction == 1 else "Asks"
+        self.order_id = rest.order_id
+        self.price = rest.price
+        self.size = size
+        self.remaining = remaining
+        self.bot_name = rest.bot_name
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} {self.ticker} {self.side} {self.size}@{self.price} ({self.order_id})"
+
+
+class DeltaLog:
+    """
+    The exchange's feed of BookDeltas. Readers keep the last seq they have seen and call since(seq) for everything
+    after it. Only about the last limit deltas are kept (all of them with limit=None); a reader that falls further
+    behind than that will find the first delta's seq is past seq + 1
+    """
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        self.deltas = []
+        self.first_seq = 1  # seq of self.deltas[0]
+        self.next_seq = 1
+
+    def append(self, kind: str, rest: "Rest", size: int, remaining: int):
+        self.deltas.append(BookDelta(self.next_seq, kind, rest, size, remaining))
+        self.next_seq += 1
+        if self.limit is not None and len(self.deltas) >= 2 * self.limit:
+            drop = len(self.deltas) - self.limit
+            del self.deltas[:drop]
+            self.first_seq += drop
+
+    def since(self, seq: int) -> List[BookDelta]:
+        return self.deltas[max(seq + 1 - self.first_seq, 0):]
+
+    @property
+    def last_seq(self) -> int:
+        return self.next_seq - 1
+
+
+class PriceLevel:
+    """
+    All resting orders at a single price, built by BookSide.queue_ahead. self.orders is keyed by order_id and, as
+    dicts keep insertion order, doubles as the FIFO queue for the level.
+
+    Each Rest gets an increasing queue_pos as it joins. The first time anyone asks how much is queued ahead of an
+    order here, self.tree is built: a Fenwick tree of the size left at each position, so the size ahead of an order
+    is a prefix sum, and from then on it is kept up to date in O(log n) as orders fill or cancel. Levels nobody
+    asks about never build one. Positions are renumbered when the tree fills up, amortised O(1) per order
+    """
+    __slots__ = ("price", "aggness", "orders", "size", "tree", "next_pos")
+
+    def __init__(self, price: float, aggness: float):
+        self.price = price
+        self.aggness = aggness
+        self.orders = {}  # order_id → Rest, oldest first
+        self.size = 0  # total size resting at this price
+        self.tree = None  # 1-indexed Fenwick tree over queue positions, once size_ahead has been used
+        self.next_pos = 1
+
+    def enqueue(self, rest: Rest):
+        if self.tree is not None and self.next_pos >= len(self.tree):
+            self._renumber()
+        rest.queue_pos = self.next_pos
+        self.next_pos += 1
+        self.orders[rest.order_id] = rest
+        self.size += rest.size
+        if self.tree is not None:
+            self.reduce(rest.queue_pos, -rest.size)
+
+    def reduce(self, pos: int, size: int):
+        """
+        Takes size off the order at queue position pos in the tree
+        """
+        tree = self.tree
+        end = len(tree)
+        while pos < end:
+            tree[pos] -= size
+            pos += pos & -pos
+
+    def size_ahead(self, rest: Rest) -> int:
+        """
+        Total size of the orders queued in front of rest at this price
+        """
+        if self.tree is None:
+            self._renumber()
+        total = 0
+        tree = self.tree
+        pos = rest.queue_pos - 1
+        while pos > 0:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def _renumber(self):
+        capacity = max(16, 2 * len(self.orders))
+        tree = [0] * (capacity + 1)
+        for pos, rest in enumerate(self.orders.values(), start=1):
+            rest.queue_pos = pos
+            tree[pos] = rest.size
+        for pos in range(1, capacity + 1):  # O(n) Fenwick build
+            parent = pos + (pos & -pos)
+            if parent <= capacity:
+                tree[parent] += tree[pos]
+        self.tree = tree
+        self.next_pos = len(self.orders) + 1
+
+    def __str__(self):
+        return f"Price: {self.price}, Size: {self.size}, Orders: {len(self.orders)}"
+
+
+class DepthView:
+    """
+    Snapshot of the top levels of one side of a book, most aggressive first: price, total size and running total
+    of size per level, as tuples. It is never changed after it is built, so bots can keep and share it freely
+    """
+    __slots__ = ("depth", "prices", "sizes", "cumulative")
+
+    def __init__(self, depth: int, prices: tuple, sizes: tuple):
+        self.depth = depth  # levels asked for; len(self.prices) can be fewer
+        self.prices = prices
+        self.sizes = sizes
+        total = 0
+        cumulative = []
+        for size in sizes:
+            total += size
+            cumulative.append(total)
+        self.cumulative = tuple(cumulative)
+
+    @property
+    def best_price(self):
+        return self.prices[0] if self.prices else None
+
+    @property
+    def best_size(self) -> int:
+        return self.sizes[0] if self.sizes else 0
+
+    @property
+    def total(self) -> int:
+        return self.cumulative[-1] if self.cumulative else 0
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __repr__(self):
+        return f"DepthView({list(zip(self.prices, self.sizes))})"
+
+
+class BookSide(list):
+    """
+    One side (Bids or Asks) of a ticker's order book. It is a list of the resting Rests, most aggressive -> least
+    aggressive with FIFO order at each price, exactly like the original list book, so bots can read it as the list
+    it is. Only the exchange changes it: the list's own mutating methods raise TypeError.
+
+    Next to the list, self.sort_keys holds each order's -aggness (ascending, in step with the list), so an order's
+    place is found by a bisect in C rather than a Python scan, and self.order_index maps order_id → Rest. Adding
+    and cancelling are a bisect plus one list insert/delete, and matching takes orders off the front.
+
+    PriceLevels, with their queue-position trees, are only built for the levels queue_ahead is asked about and are
+    kept up to date from then on. depth() gives a cached DepthView of the top levels.
+    """
+    depth_levels = 5  # levels in a DepthView unless depth() is asked for another number
+
+    def __init__(self):
+        super().__init__()
+        self.sort_keys = []  # -aggness of each order in the list, ascending
+        self.order_index = {}  # order_id → Rest
+        self.levels = {}  # aggness → PriceLevel, for the levels queue_ahead has been asked about
+        self._depths = {}  # levels → (DepthView, aggness of its least aggressive level, -inf if it is not full)
+        self.deltas = None  # the exchange's DeltaLog when it keeps one, so holders of the book can reach the feed
+
+    def add(self, rest: Rest):
+        """
+        Queues a Rest at the back of its price level
+        """
+        key = -rest.aggness
+        idx = bisect_right(self.sort_keys, key)
+        list.insert(self, idx, rest)
+        self.sort_keys.insert(idx, key)
+        self.order_index[rest.order_id] = rest
+        if self.levels:
+            level = self.levels.get(rest.aggness)
+            if level is not None:
+                level.enqueue(rest)
+        if self._depths:
+            self._changed(rest.aggness)
+
+    def remove(self, order_id: int):
+        """
+        Removes an order from the book. Returns the Rest that was removed, or None if it is not resting on this side
+        """
+        rest = self.order_index.pop(order_id, None)
+        if rest is None:
+            return None
+        idx = list.index(self, rest, bisect_left(self.sort_keys, -rest.aggness))
+        list.pop(self, idx)
+        del self.sort_keys[idx]
+        if self.levels and rest.aggness in self.levels:
+            self._leave_level(rest)
+        if self._depths:
+            self._changed(rest.aggness)
+        return rest
+
+    def fill(self, rest: Rest, size: int):
+        """
+        Takes size off a resting order, removing it from the book once it is empty
+        """
+        rest.size -= size
+        if self.levels:
+            level = self.levels.get(rest.aggness)
+            if level is not None:
+                level.size -= size
+                if level.tree is not None:
+                    level.reduce(rest.queue_pos, size)
+        if self._depths:
+            self._changed(rest.aggness)
+        if rest.size == 0:
+            if self[0] is rest:  # fills happen at the top of book, so this skips remove's search
+                list.pop(self, 0)
+                del self.sort_keys[0]
+                self.order_index.pop(rest.order_id)
+                if self.levels and rest.aggness in self.levels:
+                    self._leave_level(rest)
+            else:
+                self.remove(rest.order_id)
+
+    def queue_ahead(self, order_id: int):
+        """
+        Size queued ahead of a resting order at its price, or None if it is not resting on this side
+        """
+        rest = self.order_index.get(order_id)
+        if rest is None:
+            return None
+        level = self.levels.get(rest.aggness)
+        if level is None:
+            level = self.levels[rest.aggness] = PriceLevel(rest.price, rest.aggness)
+            key = -rest.aggness
+            for queued in self[bisect_left(self.sort_keys, key):bisect_right(self.sort_keys, key)]:
+                level.enqueue(queued)
+        return level.size_ahead(rest)
+
+    def depth(self, levels: int = None) -> DepthView:
+        """
+        DepthView of the top levels (depth_levels by default). It is rebuilt only after an order is added, removed or
+        filled within those levels, so calling this every turn is O(1) while the top of the book is unchanged
+        """
+        levels = levels or self.depth_levels
+        cached = self._depths.get(levels)
+        if cached is not None:
+            return cached[0]
+        prices, sizes = [], []
+        aggness = None
+        for rest in self:
+            if rest.aggness != aggness:
+                if len(prices) == levels:
+                    break
+                aggness = rest.aggness
+                prices.append(rest.price)
+                sizes.append(0)
+            sizes[-1] += rest.size
+        view = DepthView(levels, tuple(prices), tuple(sizes))
+        self._depths[levels] = (view, aggness if len(prices) == levels else float("-inf"))
+        return view
+
+    def _leave_level(self, rest: Rest):
+        level = self.levels[rest.aggness]
+        del level.orders[rest.order_id]
+        level.size -= rest.size
+        if level.tree is not None and rest.size:
+            level.reduce(rest.queue_pos, rest.size)
+        if not level.orders:
+            del self.levels[rest.aggness]
+
+    def _changed(self, aggness: float):
+        """
+        Drops the cached DepthViews a change at aggness shows up in
+        """
+        self._depths = {levels: cached for levels, cached in self._depths.items() if aggness < cached[1]}
+
+    # ---------- The list itself is read-only, changes go through the Exchange ----------
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("BookSide is read-only, orders are added and removed through the Exchange")
+
+    append = extend = insert = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)  # copies and pickles of a side are plain lists of its Rests
+
+
+def depth_view(side, levels: int = None) -> DepthView:
+    """
+    DepthView of a BookSide (cached) or a plain list of Rests sorted most aggressive first (built each call)
+    """
+    if hasattr(side, "depth"):
+        return side.depth(levels)
+    levels = levels or BookSide.depth_levels
+    prices, sizes = [], []
+    for rest in side:
+        if not prices or rest.price != prices[-1]:
+            if len(prices) == levels:
+                break
+            prices.append(rest.price)
+            sizes.append(0)
+        sizes[-1] += rest.size
+    return DepthView(levels, tuple(prices), tuple(sizes))
+
+
+class BookSnapshot:
+    """
+    L1/L2 view of one ticker's book, built from the two sides' DepthViews:
+        snap = BookSnapshot(book["UEC"])
+        snap.best_bid, snap.microprice, snap.bids.cumulative
+    Prices are None where a side is empty
+    """
+    __slots__ = ("bids", "asks")
+
+    def __init__(self, sides, levels: int = None):
+        self.bids = depth_view(sides["Bids"], levels)
+        self.asks = depth_view(sides["Asks"], levels)
+
+    @property
+    def best_bid(self):
+        return self.bids.best_price
+
+    @property
+    def best_ask(self):
+        return self.asks.best_price
+
+    @property
+    def mid(self):
+        if not self.bids.prices or not self.asks.prices:
+            return None
+        return (self.bids.prices[0] + self.asks.prices[0]) / 2
+
+    @property
+    def spread(self):
+        if not self.bids.prices or not self.asks.prices:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    @property
+    def microprice(self):
+        """
+        Mid weighted towards the side with less size at the top: (bid * ask_size + ask * bid_size) / total size
+        """
+        if not self.bids.prices or not self.asks.prices:
+            return None
+        bid_size, ask_size = self.bids.sizes[0], self.asks.sizes[0]
+        return (self.bids.prices[0] * ask_size + self.asks.prices[0] * bid_size) / (bid_size + ask_size)
+
+    @property
+    def imbalance(self) -> float:
+        total = self.bids.best_size + self.asks.best_size
+        return (self.bids.best_size - self.asks.best_size) / total if total else 0.0
+
+
 class Exchange:
     """
     Exchange object. An exchange can hold a variety of products
+
+    self.trade_log is a columnar TradeLog. Set Exchange.trade_log_limit to only keep the most recent trades, or
+    Exchange.trade_log_spill_dir to write the log out to disk in chunks (each exchange in its own subfolder of it),
+    before the game creates its exchange
+
+    When any product has conversions, self.conversions is a ConversionEngine kept up to date with every book change
+    (None otherwise)
+
+    Set Exchange.record_deltas = True before the game creates its exchange to have every add, cancel and fill
+    appended to self.deltas, a DeltaLog keeping about the last delta_limit changes (see runner.attach_delta_feed)
     """
+    trade_log_limit = None
+    trade_log_spill_dir = None
+    record_deltas = False
+    delta_limit = 100000
+
     def __init__(self, products: List[Product]):
         self.products = products
         self.ticker_to_product = {p.ticker: p for p in self.products}
-        self.book = {p.ticker: {"Bids": [], "Asks": []} for p in self.products} # This will be stored most aggressive -> least aggressive
-        self.trade_log = []
+        self.book = {p.ticker: {"Bids": BookSide(), "Asks": BookSide()} for p in self.products} # This will be stored most aggressive -> least aggressive
+        self.trade_log = TradeLog(limit=self.trade_log_limit, spill_dir=self.trade_log_spill_dir)
         self.mapping = {"Buy": 1, "Sell": -1}
         self.name_mapping = {"Buy": "Bids", "Sell": "Asks"}
-        self.order_ids = {}  # order_id → [ticker, side] to allow for removal
-        self.action_log = []
+        self.side_mapping = {"Buy": "Asks", "Sell": "Bids"}  # the side an order matches against
+        self.order_ids = {}  # order_id → Rest for every live order, to allow for O(1) removal
+        self.seen_ids = set()  # order_ids that have been filled or removed, still rejected if reused
+        self.action_log = deque(maxlen=self.trade_log_limit)
+        conversions = ConversionEngine(products)
+        self.conversions = conversions if conversions else None
+        self.deltas = DeltaLog(self.delta_limit) if self.record_deltas else None
+        if self.deltas is not None:
+            for sides in self.book.values():
+                sides["Bids"].deltas = sides["Asks"].deltas = self.deltas
     
     def process_order(self, order: Order, loop_num=None) -> List[Trade]:
-
-        if order.order_id in self.order_ids.keys():
-            raise ValueError("Already Seen OrderId. Please ensure that a new OrderId has been generated")
-        
         trades = []
         book = self.book[order.ticker]
-        side_mapping = {"Buy": "Asks", "Sell": "Bids"}
+        if order.direction == 1:
+            self.match_order(order, book["Asks"], book["Bids"], trades)
+        else:
+            self.match_order(order, book["Bids"], book["Asks"], trades)
+        if self.conversions is not None:
+            self.conversions.update(order.ticker, book)
+        return trades
+
+    def process_batch(self, msgs: List[Msg]) -> List[Trade]:
+        """
+        Processes a whole turn's worth of ORDER and REMOVE messages in one pass and returns every trade made, in the
+        same order as sending the messages one at a time through process_order/remove_order would.
 
-        side_to_match = side_mapping[order.agg_dir]
+        The opposing/resting BookSides are looked up once per (ticker, direction) rather than once per message
+        """
+        trades = []
+        sides = {}  # (ticker, agg_dir) → (BookSide to match against, BookSide to rest on)
+        for msg in msgs:
+            if msg.msg_type == "ORDER":
+                order = msg.message
+                key = (order.ticker, order.agg_dir)
+                pair = sides.get(key)
+                if pair is None:
+                    book = self.book[order.ticker]
+                    pair = sides[key] = (book[self.side_mapping[order.agg_dir]], book[self.name_mapping[order.agg_dir]])
+                self.match_order(order, pair[0], pair[1], trades)
+            elif msg.msg_type == "REMOVE":
+                self.remove_order(msg.message)
+            else:
+                raise ValueError(f"Invalid msg_type: {msg.msg_type}. Must be 'ORDER' or 'REMOVE'.")
+        if self.conversions is not None:
+            for ticker in {key[0] for key in sides}:
+                self.conversions.update(ticker, self.book[ticker])
+        return trades
 
-        opposing_book = book[side_to_match]
+    def match_order(self, order: Order, opposing_book: BookSide, own_book: BookSide, trades: List[Trade]):
+        """
+        Matches an order against the opposing side of its book, appending any trades to trades, and rests whatever
+        size is left on its own side
+        """
+        if order.order_id in self.order_ids or order.order_id in self.seen_ids:
+            raise ValueError("Already Seen OrderId. Please ensure that a new OrderId has been generated")
+
+        is_buy = order.direction == 1
         while order.size > 0 and opposing_book: # Finds the side of the book to check against
 
             rest_order = opposing_book[0] # extracts the top of book order
-            price_match = (rest_order.price <= order.price) if order.agg_dir == "Buy" else (rest_order.price >= order.price) # Checks if the price matches
+            price_match = (rest_order.price <= order.price) if is_buy else (rest_order.price >= order.price) # Checks if the price matches
             if not price_match:
                 break # clearly future orders will also not match
 
-            trade_size = min(order.size, rest_order.size)
+            trade_size = order.size if order.size < rest_order.size else rest_order.size
 
             trade = self.record_trade(rest_order.price, trade_size, order, rest_order)
             trades.append(trade)
 
             order.size -= trade_size
-            rest_order.size -= trade_size
-
+            opposing_book.fill(rest_order, trade_size) # drops the resting order once it is filled
+            if self.deltas is not None:
+                self.deltas.append("FILL", rest_order, trade_size, rest_order.size)
             if rest_order.size == 0:
-                opposing_book.pop(0)
+                del self.order_ids[rest_order.order_id]  # retire_order, inlined for long sweeps through the book
+                self.seen_ids.add(rest_order.order_id)
 
         if order.size > 0:
-            self.add_order(order)
-
-        return trades
+            self.add_order(order, own_book)
+        else:
+            self.seen_ids.add(order.order_id)  # filled without ever resting, but its id is still used up
 
     def record_trade(self, price: float, size: int, order: Order, rest: Rest) -> Trade: # These are the trade objects that your bot will process
         trade = Trade(
@@ -165,42 +642,56 @@ class Exchange:
 
     def remove_order(self, order_id: int) -> bool:
         """
-        Need the order_id to cancel an order. Have stored the path in self.order_ids
+        Need the order_id to cancel an order. Live orders are indexed in self.order_ids
 
         Returns True if the order was successfully removed, False otherwise.
         """
-        info = self.order_ids.get(order_id)
-        if not info:
+        rest = self.order_ids.pop(order_id, None)
+        if rest is None:
             return False
-        ticker, side = info
-        book = self.book[ticker][side]
-        for idx, rest in enumerate(book):
-            if rest.order_id == order_id:
-                book.pop(idx)
-                return True
-        return False
-
-    def add_order(self, order: Order):
+        self.seen_ids.add(order_id)  # retire_order, inlined as cancels are most of the exchange's traffic
+        self.book[rest.ticker]["Bids" if rest.direction == 1 else "Asks"].remove(order_id)
+        if self.deltas is not None:
+            self.deltas.append("CANCEL", rest, rest.size, 0)
+        if self.conversions is not None:
+            self.conversions.update(rest.ticker, self.book[rest.ticker])
+        return True
+
+    def retire_order(self, order_id: int):
         """
-        Adds an order to the order book, called after ensuring that it can not trade against any of the orders in the book
+        Moves an order that has left the book (filled or removed) out of the live index and into self.seen_ids
         """
-        
-        self.order_ids[order.order_id] = [order.ticker, self.name_mapping[order.agg_dir]] # mapping to help with removal
-        rest = Rest(order.size, order.price, order.agg_dir, order.order_id, order.ticker,
-                    order.price * self.mapping[order.agg_dir], order.bot_name)
+        del self.order_ids[order_id]
+        self.seen_ids.add(order_id)
 
-        book = self.book[order.ticker]["Bids"] if order.agg_dir == "Buy" else self.book[order.ticker]["Asks"]
+    def queue_ahead(self, order_id: int):
+        """
+        Size queued ahead of a live order at its price level, or None if it is not live
+        """
+        rest = self.order_ids.get(order_id)
+        if rest is None:
+            return None
+        return self.book[rest.ticker][self.name_mapping[rest.rest_dir]].queue_ahead(order_id)
 
-        for idx, item in enumerate(book):
-            if order.aggness > item.aggness:
-                book.insert(idx, rest)
-                return
-            elif order.aggness == item.aggness:
-                insert_idx = idx
-                while insert_idx + 1 < len(book) and book[insert_idx + 1].aggness == order.aggness:
-                    insert_idx += 1
-                book.insert(insert_idx + 1, rest)
-                return
+    @property
+    def live_orders(self) -> int:
+        return len(self.order_ids)
 
-        book.append(rest)
+    @property
+    def retired_orders(self) -> int:
+        return len(self.seen_ids)
 
+    def add_order(self, order: Order, book: BookSide = None):
+        """
+        Adds an order to the order book, called after ensuring that it can not trade against any of the orders in the book.
+        book is the BookSide to rest on, if the caller has already looked it up
+        """
+        rest = Rest(order.size, order.price, DIRECTION_NAMES[order.direction], order.order_id, order.ticker,
+                    order.price * order.direction, order.bot_name)
+        self.order_ids[order.order_id] = rest # mapping to help with removal
+
+        if book is None:
+            book = self.book[order.ticker]["Bids" if order.direction == 1 else "Asks"]
+        book.add(rest) # joins the back of the queue at its price
+        if self.deltas is not None:
+            self.deltas.append("ADD", rest, rest.size, rest.size)
@@ -0,0 +1,274 @@
+"""
+Benchmarks for the matching engine (base.Exchange) and the full game loop.
+
+Every benchmark runs in its own fresh process so peak RSS is its own, and reports ops, seconds, ops/sec, p50/p99
+latency per op (microseconds) and peak RSS (MB). The results can be written out as JSON and compared against a
+stored baseline:
+    python bench.py --output baseline.json
+    python bench.py --baseline baseline.json
+bench_baseline.json holds the exchange benchmarks measured on the tree before any of the exchange changes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+from base import Exchange, Order, Product
+from profiler import LatencyHistogram
+
+BENCH_BOT = "bench"
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+class Timer:
+    """
+    Times each op into a LatencyHistogram and adds up the total
+    """
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+
+    def __call__(self, func, *args):
+        start = time.perf_counter_ns()
+        result = func(*args)
+        self.histogram.record(time.perf_counter_ns() - start)
+        return result
+
+    def result(self, unit: str, **extra) -> Dict:
+        histogram = self.histogram
+        seconds = histogram.total_ns / 1e9
+        return {"unit": unit, "ops": histogram.count, "seconds": seconds,
+                "ops_per_sec": histogram.count / seconds if seconds else None,
+                "p50_us": histogram.percentile(50) / 1e3, "p99_us": histogram.percentile(99) / 1e3, **extra}
+
+
+class OrderIds:
+    def __init__(self):
+        self.next_id = 0
+
+    def __call__(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+
+def mm_refresh(scale: float = 1.0, seed: int = 0) -> Dict:
+    """
+    A market maker pulling and re-posting its whole ladder every step around a random-walking mid, while a taker
+    trades against it now and then. One op is one process_order/remove_order call
+    """
+    rng = random.Random(seed)
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    new_id = OrderIds()
+    timer = Timer()
+    levels, size, mid = 10, 20, 1000.0
+    live = []
+    for _ in range(int(20000 * scale)):
+        for order_id in live:
+            timer(exchange.remove_order, order_id)
+        live = []
+        mid += rng.choice((-1, 0, 1)) * 0.5
+        for level in range(levels):
+            for price, direction in ((mid - 2 - level, "Buy"), (mid + 2 + level, "Sell")):
+                order = Order("UEC", price, size, new_id(), direction, BENCH_BOT)
+                live.append(order.order_id)
+                timer(exchange.process_order, order)
+        if rng.random() < 0.3:
+            direction = rng.choice(("Buy", "Sell"))
+            price = mid + 5 if direction == "Buy" else mid - 5
+            timer(exchange.process_order, Order("UEC", price, rng.randint(1, 60), new_id(), direction, "taker"))
+    return timer.result("exchange call")
+
+
+def deep_sweep(scale: float = 1.0, seed: int = 0) -> Dict:
+    """
+    Builds a deep book of many small orders, then sweeps through most of it with single large aggressive orders.
+    One op is one sweeping order
+    """
+    rng = random.Random(seed)
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    new_id = OrderIds()
+    timer = Timer()
+    for _ in range(int(200 * scale)):
+        total = 0
+        for level in range(200):
+            for _ in range(5):
+                order_size = rng.randint(1, 10)
+                total += order_size
+                exchange.process_order(Order("UEC", 1000.0 + level * 0.1, order_size, new_id(), "Sell", BENCH_BOT))
+        timer(exchange.process_order, Order("UEC", 1100.0, total, new_id(), "Buy", "sweeper"))
+    return timer.result("sweep", trades=len(exchange.trade_log))
+
+
+def cancel_replace(scale: float = 1.0, seed: int = 0) -> Dict:
+    """
+    Keeps thousands of orders resting and repeatedly cancels a random one and replaces it at a new price.
+    One op is one process_order/remove_order call
+    """
+    rng = random.Random(seed)
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    new_id = OrderIds()
+    timer = Timer()
+    live = []
+    for _ in range(5000):
+        direction = rng.choice(("Buy", "Sell"))
+        price = 1000.0 - rng.randint(1, 200) * 0.1 if direction == "Buy" else 1000.0 + rng.randint(1, 200) * 0.1
+        order = Order("UEC", price, rng.randint(1, 20), new_id(), direction, BENCH_BOT)
+        exchange.process_order(order)
+        live.append((order.order_id, direction))
+    for _ in range(int(100000 * scale)):
+        idx = rng.randrange(len(live))
+        order_id, direction = live[idx]
+        timer(exchange.remove_order, order_id)
+        price = 1000.0 - rng.randint(1, 200) * 0.1 if direction == "Buy" else 1000.0 + rng.randint(1, 200) * 0.1
+        order = Order("UEC", price, rng.randint(1, 20), new_id(), direction, BENCH_BOT)
+        timer(exchange.process_order, order)
+        live[idx] = (order.order_id, direction)
+    return timer.result("exchange call")
+
+
+def many_tickers(scale: float = 1.0, seed: int = 0, num_tickers: int = 200) -> Dict:
+    """
+    Random limit and marketable orders plus cancels spread over many tickers. One op is one exchange call
+    """
+    rng = random.Random(seed)
+    tickers = [f"T{i}" for i in range(num_tickers)]
+    exchange = Exchange([Product(ticker, mpv=0.1) for ticker in tickers])
+    new_id = OrderIds()
+    timer = Timer()
+    live = []
+    for _ in range(int(200000 * scale)):
+        if live and rng.random() < 0.4:
+            timer(exchange.remove_order, live.pop(rng.randrange(len(live))))
+            continue
+        direction = rng.choice(("Buy", "Sell"))
+        offset = rng.randint(-3, 20) * 0.1  # mostly passive, sometimes crossing
+        price = 100.0 - offset if direction == "Buy" else 100.0 + offset
+        order = Order(rng.choice(tickers), price, rng.randint(1, 20), new_id(), direction, BENCH_BOT)
+        timer(exchange.process_order, order)
+        live.append(order.order_id)
+    return timer.result("exchange call", tickers=num_tickers)
+
+
+def game(scale: float = 1.0, seed: int = 7) -> Dict:
+    """
+    A full run_game of the template PlayerAlgorithm on a fixed seed. One op is one timestep, timed from one
+    send_messages call to the next
+    """
+    from play_game import make_products
+    from runner import play_one
+    from your_algo import PlayerAlgorithm
+
+    num_timestamps = int(2000 * scale)
+    histogram = LatencyHistogram()
+
+    class TimedAlgorithm(PlayerAlgorithm):
+        last = None
+
+        def send_messages(self, book):
+            now = time.perf_counter_ns()
+            if self.last is not None:
+                histogram.record(now - self.last)
+            self.last = now
+            return super().send_messages(book)
+
+    result = play_one(TimedAlgorithm, make_products, num_timestamps, seed)
+    return {"unit": "timestep", "ops": num_timestamps, "seconds": result["time"],
+            "ops_per_sec": num_timestamps / result["time"], "p50_us": histogram.percentile(50) / 1e3,
+            "p99_us": histogram.percentile(99) / 1e3, "pnl": result["pnl"]}
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict]] = {
+    "mm_refresh": mm_refresh,
+    "deep_sweep": deep_sweep,
+    "cancel_replace": cancel_replace,
+    "many_tickers": many_tickers,
+    "game": game,
+}
+
+
+def _run_benchmark(name: str, scale: float) -> Dict:
+    result = BENCHMARKS[name](scale)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_benchmarks(names: List[str] = None, scale: float = 1.0, fresh_process: bool = True) -> Dict:
+    """
+    Runs the named benchmarks (all by default), each in a fresh process unless fresh_process is False, and returns
+    {"meta": ..., "results": {name: result}}
+    """
+    names = names or list(BENCHMARKS)
+    results = {}
+    for name in names:
+        if fresh_process:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results[name] = pool.submit(_run_benchmark, name, scale).result()
+        else:
+            results[name] = _run_benchmark(name, scale)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "scale": scale,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float = 0.1) -> List[str]:
+    """
+    Prints each benchmark's ops/sec and p99 against the baseline's and returns the names that got slower by more
+    than threshold (as a fraction)
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base.get("ops_per_sec") or not result.get("ops_per_sec"):
+            continue
+        ratio = result["ops_per_sec"] / base["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            regressions.append(name)
+            flag = "  <-- slower"
+        print(f"  {name:<16}{ratio:>8.2f}x ops/sec, p99 {base['p99_us']:.1f} -> {result['p99_us']:.1f}us{flag}")
+    return regressions
+
+
+def print_results(results: Dict):
+    print(f"{'benchmark':<16}{'ops':>10}{'ops/sec':>14}{'p50 us':>10}{'p99 us':>10}{'peak MB':>10}")
+    for name, result in results["results"].items():
+        rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "-"
+        print(f"{name:<16}{result['ops']:>10}{result['ops_per_sec']:>14.0f}{result['p50_us']:>10.1f}"
+              f"{result['p99_us']:>10.1f}{rss:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the exchange and the game loop")
+    parser.add_argument("benchmarks", nargs="*", help=f"which to run, of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the work each benchmark does")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results written earlier with --output")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown (fraction) counted as a regression")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.benchmarks, args.scale)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {os.path.basename(args.baseline)}:")
+        if compare_to_baseline(results, baseline, args.threshold):
+            raise SystemExit(1)
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from recorder import META_FILE, Recording, write_meta
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ".book_cache")
+
+
+def load_book_csv(path: str, cache_dir: str = None, ticker: str = "UEC") -> Recording:
+    """
+    Loads a top-of-book CSV like Prices.csv (index, Bids, Asks) or AllMarkets.csv / Test.csv (Market, Bids, Asks).
+
+    The first load parses the CSV and writes it out in the BookRecorder column format under
+    cache_dir/<name>-<hash of the file>; every later load of an unchanged file just memory-maps that, so reloading is
+    near-instant. Empty sides of the book are NaN (see Recording.empty_bids/empty_asks). The CSVs carry no sizes, so
+    the size columns are 0 and meta["sizes_known"] is False
+    """
+    digest = file_hash(path)
+    cache_dir = cache_dir or default_cache_dir(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(cache_dir, f"{name}-{digest[:16]}")
+    if not os.path.exists(os.path.join(target, META_FILE)):
+        convert_csv(path, target, ticker, digest)
+    return Recording(target)
+
+
+def convert_csv(path: str, target: str, ticker: str = "UEC", digest: str = None) -> None:
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    rows = len(df)
+    market = df["Market"].to_numpy(dtype=np.int32) if "Market" in df else np.ones(rows, dtype=np.int32)
+    columns = {
+        "market": market,
+        "timestep": df.groupby(market).cumcount().to_numpy(dtype=np.int64),  # timestep within each market
+        "ticker": np.zeros(rows, dtype=np.int16),
+        "bid_price": df["Bids"].to_numpy(dtype=np.float64),
+        "bid_size": np.zeros(rows, dtype=np.int64),
+        "ask_price": df["Asks"].to_numpy(dtype=np.float64),
+        "ask_size": np.zeros(rows, dtype=np.int64),
+    }
+
+    # Written to a temporary folder first so a half-finished conversion is never picked up as a cache hit
+    tmp_target = target + ".tmp"
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    os.makedirs(tmp_target)
+    for column_name, column in columns.items():
+        column.tofile(os.path.join(tmp_target, f"{column_name}.bin"))
+    write_meta(tmp_target, {
+        "tickers": [ticker],
+        "depth": 1,
+        "rows": rows,
+        "timesteps": int(columns["timestep"].max()) + 1 if rows else 0,
+        "columns": {column_name: {"dtype": column.dtype.str, "width": 1} for column_name, column in columns.items()},
+        "sizes_known": False,
+        "source": os.path.abspath(path),
+        "sha1": digest or file_hash(path),
+    })
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_target, target)
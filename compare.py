@@ -0,0 +1,208 @@
+import argparse
+import importlib
+import importlib.abc
+import importlib.util
+import math
+import os
+import sys
+from statistics import NormalDist
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from runner import load_run_game, new_seeds, run_games, summarise
+
+
+class AlgoFileFinder(importlib.abc.MetaPathFinder):
+    """
+    Imports bot files under a module name made from their absolute path, so your_algo.py and v2/your_algo.py are
+    two different modules. The path can be read back from the name, which lets process-pool workers import the
+    module again when they unpickle a bot class from it
+    """
+    prefix = "_algo_file_"
+
+    @classmethod
+    def module_name(cls, path: str) -> str:
+        return cls.prefix + os.path.abspath(path).encode().hex()
+
+    def find_spec(self, name, path=None, target=None):
+        if not name.startswith(self.prefix):
+            return None
+        return importlib.util.spec_from_file_location(name, bytes.fromhex(name[len(self.prefix):]).decode())
+
+
+sys.meta_path.append(AlgoFileFinder())
+
+
+def load_algo(spec: str):
+    """
+    Loads a bot class from "module:Class" or "path/to/file.py:Class" (Class defaults to PlayerAlgorithm).
+    Files are imported by path (see AlgoFileFinder), with their folder put on sys.path for the modules they import
+    """
+    target, _, cls_name = spec.partition(":")
+    cls_name = cls_name or "PlayerAlgorithm"
+    if target.endswith(".py"):
+        folder = os.path.dirname(os.path.abspath(target))
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+        target = AlgoFileFinder.module_name(target)
+    return getattr(importlib.import_module(target), cls_name)
+
+
+def t_cdf(t: float, dof: int) -> float:
+    """
+    Exact Student-t CDF for a whole number of degrees of freedom, from the finite cos(theta) series of
+    Abramowitz & Stegun 26.7.3/26.7.4
+    """
+    theta = math.atan(abs(t) / math.sqrt(dof))
+    cos2 = math.cos(theta) ** 2
+    if dof % 2:
+        term, total = 1.0, 1.0 if dof > 1 else 0.0
+        for k in range(3, dof - 1, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        two_sided = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    else:
+        term, total = 1.0, 1.0
+        for k in range(2, dof - 1, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        two_sided = math.sin(theta) * total
+    return 0.5 + math.copysign(two_sided / 2, t)
+
+
+def t_quantile(p: float, dof: int) -> float:
+    """
+    Student-t quantile. Exact (t_cdf inverted by bisection) up to 30 degrees of freedom, where few seeds make the
+    tails matter; above that a Cornish-Fisher expansion from the normal quantile, good to ~4 decimal places
+    """
+    if dof <= 0:
+        return float("inf")
+    if p < 0.5:
+        return -t_quantile(1 - p, dof)
+    if dof <= 30:
+        low, high = 0.0, 1.0
+        while t_cdf(high, dof) < p:
+            low, high = high, 2 * high
+        for _ in range(100):
+            mid = (low + high) / 2
+            if t_cdf(mid, dof) < p:
+                low = mid
+            else:
+                high = mid
+        return (low + high) / 2
+    z = NormalDist().inv_cdf(p)
+    return (z
+            + (z ** 3 + z) / (4 * dof)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+
+def paired_stats(diffs: List[float], confidence: float = 0.95) -> Dict:
+    """
+    Mean of paired PnL differences with a t confidence interval
+    """
+    diffs = np.asarray(diffs, dtype=float)
+    n = len(diffs)
+    mean = float(diffs.mean()) if n else float("nan")
+    if n < 2:
+        return {"n": n, "mean": mean, "std": float("nan"), "low": float("-inf"), "high": float("inf")}
+    std = float(diffs.std(ddof=1))
+    half_width = t_quantile(0.5 + confidence / 2, n - 1) * std / np.sqrt(n)
+    return {"n": n, "mean": mean, "std": std, "low": mean - half_width, "high": mean + half_width}
+
+
+def compare(algo_classes: List, make_products: Callable, num_timestamps: int, seeds: List[int] = None,
+            max_runs: int = 40, min_runs: int = 5, batch_size: int = None, confidence: float = 0.95,
+            tolerance: float = 0.0, num_workers: int = None, on_batch: Callable[[Dict], None] = None) -> Dict:
+    """
+    Common-random-numbers comparison: every bot in algo_classes plays the same seeds, and each challenger's PnL is
+    differenced against algo_classes[0] seed by seed. The NPC bots start from identical random paths, so the shared
+    market noise mostly cancels in the differences and far fewer runs are needed than with independent samples.
+
+    Seeds are played in batches (batch_size defaults to one per core). After at least min_runs, it stops as soon as
+    every challenger's confidence interval either excludes 0 (the difference is resolved) or is narrower than
+    +/- tolerance (the bots are equivalent for practical purposes), or once max_runs seeds have been played.
+    As the check is repeated after every batch, the intervals are a little optimistic; raise confidence if that matters.
+
+    Returns {"seeds", "results" (per bot), "summaries" (per bot), "differences" (per challenger), "stopped_early"}
+    """
+    seeds = list(seeds) if seeds is not None else new_seeds(max_runs)
+    seeds = seeds[:max_runs]
+    batch_size = batch_size or os.cpu_count() or 1
+
+    results = [[] for _ in algo_classes]
+    differences = {}
+    stopped_early = False
+    played = 0
+    while played < len(seeds):
+        batch = seeds[played:played + batch_size]
+        for results_for_algo, algo_cls in zip(results, algo_classes):
+            results_for_algo.extend(run_games(algo_cls, make_products, num_timestamps, batch, num_workers=num_workers))
+        played += len(batch)
+
+        base_pnls = [r["pnl"] for r in results[0]]
+        differences = {}
+        for idx, algo_cls in enumerate(algo_classes[1:], start=1):
+            diffs = [r["pnl"] - base for r, base in zip(results[idx], base_pnls)]
+            differences[f"{idx}:{algo_cls.__module__}.{algo_cls.__name__}"] = paired_stats(diffs, confidence)
+
+        if on_batch is not None:
+            on_batch(differences)
+        if played >= min_runs and all(_resolved(stats, tolerance) for stats in differences.values()):
+            stopped_early = played < len(seeds)
+            break
+
+    return {
+        "seeds": seeds[:played],
+        "results": results,
+        "summaries": [summarise(r) for r in results],
+        "differences": differences,
+        "stopped_early": stopped_early,
+    }
+
+
+def _resolved(stats: Dict, tolerance: float) -> bool:
+    return stats["low"] > 0 or stats["high"] < 0 or (stats["high"] - stats["low"]) / 2 < tolerance
+
+
+def print_differences(differences: Dict):
+    for name, stats in differences.items():
+        print(f"  {name} - baseline: {stats['mean']:.2f} over {stats['n']} seeds, "
+              f"CI [{stats['low']:.2f}, {stats['high']:.2f}]")
+
+
+if __name__ == "__main__":
+    from play_game import make_products, num_timestamps
+
+    parser = argparse.ArgumentParser(description="Paired comparison of bots on shared seeds. The first bot is the "
+                                                 "baseline, e.g. python compare.py your_algo.py other_algo.py:MyBot")
+    parser.add_argument("algos", nargs="+", help="module:Class or file.py:Class (Class defaults to PlayerAlgorithm)")
+    parser.add_argument("--timestamps", type=int, default=num_timestamps)
+    parser.add_argument("--max-runs", type=int, default=40)
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--tolerance", type=float, default=0.0, help="stop once CIs are narrower than +/- this")
+    parser.add_argument("--seeds", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+    if len(args.algos) < 2:
+        parser.error("need at least two bots to compare")
+
+    load_run_game()
+    algo_classes = [load_algo(spec) for spec in args.algos]
+
+    def on_batch(differences):
+        print(f"\nAfter {next(iter(differences.values()))['n']} seeds:")
+        print_differences(differences)
+
+    outcome = compare(algo_classes, make_products, args.timestamps, seeds=args.seeds, max_runs=args.max_runs,
+                      min_runs=args.min_runs, batch_size=args.batch_size, confidence=args.confidence,
+                      tolerance=args.tolerance, num_workers=args.workers, on_batch=on_batch)
+
+    print(f"\nPlayed {len(outcome['seeds'])} seeds" + (" (stopped early)" if outcome["stopped_early"] else ""))
+    for spec, summary in zip(args.algos, outcome["summaries"]):
+        print(f"  {spec}: mean PnL {summary['mean_pnl']:.2f}, std {summary['std_pnl']:.2f}, "
+              f"E[PnL] - 0.1 * STD[PnL] {summary['score']:.2f}")
+    print_differences(outcome["differences"])
@@ -0,0 +1,166 @@
+import math
+from typing import Dict, List
+
+NAN = float("nan")
+
+
+class Conversion:
+    """
+    One directed edge of the conversion graph: a unit of src can be turned into ratio units of dst for fee (cash per
+    unit of src). Implied quotes along it are kept up to date by ConversionEngine:
+    - implied_ask: what a unit of dst costs by buying src and converting, (ask_src + fee) / ratio
+    - implied_bid: what a unit of src fetches by converting it and selling dst, bid_dst * ratio - fee
+    - profit: per unit of src, from buying src, converting and selling dst (implied_bid - ask_src)
+    - size: units of src that can go round at the top-of-book sizes
+    """
+    __slots__ = ("src", "dst", "ratio", "fee", "implied_ask", "implied_bid", "profit", "size")
+
+    def __init__(self, src: str, dst: str, ratio: float, fee: float = 0.0):
+        if ratio <= 0:
+            raise ValueError(f"Conversion ratio from {src} to {dst} must be positive, got {ratio}")
+        self.src = src
+        self.dst = dst
+        self.ratio = ratio
+        self.fee = fee
+        self.implied_ask = NAN
+        self.implied_bid = NAN
+        self.profit = NAN
+        self.size = 0
+
+    def __repr__(self):
+        return f"Conversion({self.src} -> {self.ratio} {self.dst}, fee {self.fee})"
+
+
+class ImpliedQuote:
+    """
+    Best implied bid/ask for a ticker across all its conversions, and the Conversion each comes from (None if none)
+    """
+    __slots__ = ("bid", "bid_via", "ask", "ask_via")
+
+    def __init__(self):
+        self.bid = NAN
+        self.bid_via = None
+        self.ask = NAN
+        self.ask_via = None
+
+    def __repr__(self):
+        return f"ImpliedQuote(bid={self.bid}, ask={self.ask})"
+
+
+def parse_conversions(products) -> List[Conversion]:
+    """
+    Builds the conversion edges from Product.conversions, which maps a target ticker to either a ratio (units of
+    the target per unit of the product) or a (ratio, fee) pair. Targets that are not traded are skipped
+    """
+    tickers = {p.ticker for p in products}
+    edges = []
+    for product in products:
+        for dst, spec in product.conversions.items():
+            if dst not in tickers or dst == product.ticker:
+                continue
+            ratio, fee = (spec, 0.0) if isinstance(spec, (int, float)) else spec
+            edges.append(Conversion(product.ticker, dst, float(ratio), float(fee)))
+    return edges
+
+
+def _top(side):
+    """
+    (price, size at that price) of the best level of a BookSide or a list of Rests, (nan, 0) if empty
+    """
+    if not side:
+        return NAN, 0
+    if hasattr(side, "depth"):
+        view = side.depth()
+        return view.best_price, view.best_size
+    price = side[0].price
+    size = 0
+    for rest in side:
+        if rest.price != price:
+            break
+        size += rest.size
+    return price, size
+
+
+class ConversionEngine:
+    """
+    Implied quotes across the conversion graph precomputed from the products' conversions.
+
+    update(ticker, sides) is called when a ticker's book may have changed. It reads the top of book in O(1) and,
+    only if the best price or size moved, recomputes the conversions touching that ticker and the best implied
+    quotes of the tickers at their other ends. Everything else is left alone, so reading self.quotes[ticker],
+    a Conversion, or self.arbitrage (conversions currently showing a profit) is O(1) at any time.
+
+    base.Exchange keeps one as exchange.conversions when any product has conversions. A bot, which only sees the
+    book, can keep its own and call refresh(book) at the start of each turn.
+    """
+    def __init__(self, products):
+        self.conversions = parse_conversions(products)
+        self.tickers = [p.ticker for p in products]
+        self.tops = {ticker: (NAN, 0, NAN, 0) for ticker in self.tickers}  # bid, bid size, ask, ask size
+        self.quotes = {ticker: ImpliedQuote() for ticker in self.tickers}
+        self.touching = {ticker: [] for ticker in self.tickers}  # ticker → conversions it is an end of
+        self.pairs = {}  # (src, dst) → Conversion
+        for conversion in self.conversions:
+            self.touching[conversion.src].append(conversion)
+            self.touching[conversion.dst].append(conversion)
+            self.pairs[(conversion.src, conversion.dst)] = conversion
+        self.arbitrage = {}  # (src, dst) → Conversion with a positive profit right now
+
+    def __bool__(self):
+        return bool(self.conversions)
+
+    def update(self, ticker: str, sides: Dict) -> bool:
+        """
+        Takes a ticker's {"Bids": ..., "Asks": ...} and returns whether its top of book had changed
+        """
+        touching = self.touching.get(ticker)
+        if not touching:
+            return False
+        top = _top(sides["Bids"]) + _top(sides["Asks"])
+        if top == self.tops[ticker]:
+            return False
+        self.tops[ticker] = top
+
+        affected = set()
+        for conversion in touching:
+            self._price(conversion)
+            affected.add(conversion.src)
+            affected.add(conversion.dst)
+        for other in affected:
+            self._best(other)
+        return True
+
+    def refresh(self, book: Dict):
+        for ticker in self.touching:
+            if ticker in book:
+                self.update(ticker, book[ticker])
+
+    def implied(self, ticker: str) -> ImpliedQuote:
+        return self.quotes[ticker]
+
+    def pair(self, src: str, dst: str) -> Conversion:
+        return self.pairs.get((src, dst))
+
+    def _price(self, conversion: Conversion):
+        src_bid, src_bid_size, src_ask, src_ask_size = self.tops[conversion.src]
+        dst_bid, dst_bid_size, dst_ask, dst_ask_size = self.tops[conversion.dst]
+        conversion.implied_ask = (src_ask + conversion.fee) / conversion.ratio if src_ask_size else NAN
+        conversion.implied_bid = dst_bid * conversion.ratio - conversion.fee if dst_bid_size else NAN
+        conversion.profit = conversion.implied_bid - src_ask
+        conversion.size = min(src_ask_size, math.floor(dst_bid_size / conversion.ratio))
+        key = (conversion.src, conversion.dst)
+        if conversion.profit > 0 and conversion.size > 0:
+            self.arbitrage[key] = conversion
+        else:
+            self.arbitrage.pop(key, None)
+
+    def _best(self, ticker: str):
+        quote = self.quotes[ticker]
+        quote.bid, quote.bid_via, quote.ask, quote.ask_via = NAN, None, NAN, None
+        for conversion in self.touching[ticker]:
+            bid = conversion.implied_bid if conversion.src == ticker else NAN
+            if not math.isnan(bid) and (quote.bid_via is None or bid > quote.bid):
+                quote.bid, quote.bid_via = bid, conversion
+            ask = conversion.implied_ask if conversion.dst == ticker else NAN
+            if not math.isnan(ask) and (quote.ask_via is None or ask < quote.ask):
+                quote.ask, quote.ask_via = ask, conversion
@@ -0,0 +1,77 @@
+"""
+Vectorized what-if simulation of our orders against the README's market maker, for many order-flow scenarios at
+once (rows are scenarios, columns are turns).
+
+Each turn the market maker has refreshed its quotes around its current mid, our order for that turn trades into
+them (walking levels as in settlement.MarketMakerModel), and the mid then fades by fade per unit we traded, plus
+any outside moves given as mid_noise (the rest of the market trading with it). With market orders only the fills
+are the orders themselves, so the whole batch is a handful of cumulative sums; with limit prices the fills depend
+on the mid path, so turns are stepped through one at a time, still vectorized across scenarios.
+"""
+from typing import Dict
+
+import numpy as np
+
+from settlement import MarketMakerModel, fines
+
+
+def _capacity(model: MarketMakerModel, orders: np.ndarray, limits: np.ndarray, mid: np.ndarray) -> np.ndarray:
+    """
+    Units the market maker quotes at or better than each order's limit price this turn
+    """
+    touch = np.where(orders > 0, mid + model.width / 2, mid - model.width / 2)
+    room = np.where(orders > 0, limits - touch, touch - limits)
+    levels = np.floor(room / model.spacing + 1e-9) + 1
+    return np.maximum(levels, 0) * model.level_size
+
+
+def simulate(orders, mid0: float = 1000.0, model: MarketMakerModel = None, limits=None, mid_noise=None,
+             start_position: int = 0, pos_limit: int = None, fine: float = 0) -> Dict[str, np.ndarray]:
+    """
+    Plays orders (an array of signed sizes, > 0 to buy, shape (scenarios, turns) or (turns,)) into the market maker.
+
+    limits: optional limit prices, same shape as orders (NaN for no limit). Fills stop at the last level inside it.
+    mid_noise: optional outside mid moves applied after each turn, same shape as orders.
+    pos_limit/fine: charge fines on the end-of-turn position, as the game does every cycle.
+
+    Returns arrays per scenario: fills and cash (per turn), positions (end of turn), mids (mid each turn traded
+    at, plus the final mid, so one longer), fines (running total), settlement (final position traded back into the
+    market maker) and pnl (cash + settlement - fines)
+    """
+    model = model or MarketMakerModel()
+    orders = np.atleast_2d(np.asarray(orders, dtype=float))
+    noise = np.zeros_like(orders) if mid_noise is None else np.atleast_2d(np.asarray(mid_noise, dtype=float))
+    num_scenarios, num_turns = orders.shape
+
+    if limits is None:
+        fills = orders
+        moves = model.fade * fills + noise
+        mids = np.empty((num_scenarios, num_turns + 1))
+        mids[:, 0] = mid0
+        np.cumsum(moves, axis=1, out=mids[:, 1:])
+        mids[:, 1:] += mid0
+    else:
+        limits = np.atleast_2d(np.asarray(limits, dtype=float))
+        fills = np.empty_like(orders)
+        mids = np.empty((num_scenarios, num_turns + 1))
+        mids[:, 0] = mid0
+        for t in range(num_turns):
+            order, mid = orders[:, t], mids[:, t]
+            capacity = np.where(np.isnan(limits[:, t]), np.inf, _capacity(model, order, limits[:, t], mid))
+            fills[:, t] = np.sign(order) * np.minimum(np.abs(order), capacity)
+            mids[:, t + 1] = mid + model.fade * fills[:, t] + noise[:, t]
+
+    cash = model.trade_cash(fills, mids[:, :-1])
+    positions = start_position + np.cumsum(fills, axis=1)
+    fine_path = np.zeros_like(positions) if pos_limit is None else np.cumsum(fines(positions, pos_limit, fine), axis=1)
+    settlement = model.settlement_value(positions[:, -1], mids[:, -1])
+    pnl = cash.sum(axis=1) + settlement - fine_path[:, -1]
+    return {"fills": fills, "cash": cash, "positions": positions, "mids": mids, "fines": fine_path,
+            "settlement": settlement, "pnl": pnl}
+
+
+def random_noise(num_scenarios: int, num_turns: int, step_std: float = 0.3, seed: int = None) -> np.ndarray:
+    """
+    Gaussian random-walk mid moves to use as mid_noise
+    """
+    return np.random.default_rng(seed).normal(0.0, step_std, size=(num_scenarios, num_turns))
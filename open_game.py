@@ -0,0 +1,240 @@
+"""
+An open, minimal game loop on base.Exchange for cheap games in parameter sweeps, with NPC bots you choose.
+
+It follows the README's game flow: each timestep every bot in turn gets send_messages(exchange.book), its messages
+go to the exchange, and if they made any trades every bot gets process_trades(trades). Position fines are charged
+on our bot at the end of each cycle and its final position is settled against the market maker, as in the game.
+
+The NPCs here are simple stand-ins for the compiled ones (a README-style market maker and random customer flow),
+so results are for comparing parameters against each other, not a substitute for play_game.py. Any object with
+name, send_messages and process_trades can be passed as an NPC.
+"""
+import random
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from base import Exchange, Msg, Order, Product, Trade
+from runner import EarlyStopped, PositionTracker, StopRules
+from settlement import MarketMakerModel
+
+
+class FastExchange(Exchange):
+    """
+    Exchange that skips the trade log, for analytics=False games
+    """
+    def record_trade(self, price: float, size: int, order: Order, rest) -> Trade:
+        return Trade(price, size, order.ticker, order.order_id, rest.order_id, order.agg_dir, order.bot_name,
+                     rest.bot_name)
+
+
+class MarketMakerNPC:
+    """
+    Quotes levels of level_size each side, spacing apart and width wide, around a mid that fades by
+    spacing / level_size per unit of its net position and drifts by a random walk of drift_std per turn.
+    All its quotes are pulled and re-sent every turn
+    """
+    def __init__(self, product: Product, mid: float = 1000.0, level_size: int = 20, spacing: float = 1.0,
+                 width: float = 4.0, levels: int = 5, drift_std: float = 0.0, seed: int = None,
+                 name: str = "market_maker", id_base: float = 5e7):
+        self.product = product
+        self.anchor = mid
+        self.model = MarketMakerModel(level_size, spacing, width)
+        self.levels = levels
+        self.drift_std = drift_std
+        self.rng = random.Random(seed)
+        self.name = name
+        self.next_id = id_base
+        self.position = 0
+        self.live = []
+
+    @property
+    def mid(self) -> float:
+        return self.anchor - self.model.fade * self.position
+
+    def send_messages(self, book) -> List[Msg]:
+        if self.drift_std:
+            self.anchor += self.rng.gauss(0.0, self.drift_std)
+        messages = [Msg("REMOVE", order_id) for order_id in self.live]
+        self.live = []
+        mid, mpv = self.mid, self.product.mpv
+        for level in range(self.levels):
+            offset = self.model.width / 2 + level * self.model.spacing
+            for price, direction in ((mid - offset, "Buy"), (mid + offset, "Sell")):
+                self.next_id += 1
+                order = Order(self.product.ticker, round(round(price / mpv) * mpv, 8), self.model.level_size,
+                              self.next_id, direction, self.name)
+                messages.append(Msg("ORDER", order))
+                self.live.append(self.next_id)
+        return messages
+
+    def process_trades(self, trades: List[Trade]) -> None:
+        for trade in trades:
+            if trade.rest_bot == self.name and trade.ticker == self.product.ticker:
+                self.position -= trade.size * trade.direction
+            elif trade.agg_bot == self.name and trade.ticker == self.product.ticker:
+                self.position += trade.size * trade.direction
+
+
+class CustomerFlowNPC:
+    """
+    With probability rate each turn, sends a market order of 1..max_size (random side) that takes whatever is at
+    the touch; anything left over is cancelled on its next turn
+    """
+    def __init__(self, product: Product, rate: float = 0.3, max_size: int = 20, seed: int = None,
+                 name: str = "customer_flow", id_base: float = 1e7):
+        self.product = product
+        self.rate = rate
+        self.max_size = max_size
+        self.rng = random.Random(seed)
+        self.name = name
+        self.next_id = id_base
+        self.live = []
+
+    def send_messages(self, book) -> List[Msg]:
+        messages = [Msg("REMOVE", order_id) for order_id in self.live]
+        self.live = []
+        if self.rng.random() >= self.rate:
+            return messages
+        direction = self.rng.choice(("Buy", "Sell"))
+        opposite = book[self.product.ticker]["Asks" if direction == "Buy" else "Bids"]
+        if not opposite:
+            return messages
+        self.next_id += 1
+        messages.append(Msg("ORDER", Order(self.product.ticker, opposite[0].price, self.rng.randint(1, self.max_size),
+                                           self.next_id, direction, self.name)))
+        self.live.append(self.next_id)
+        return messages
+
+    def process_trades(self, trades: List[Trade]) -> None:
+        pass
+
+
+def default_npcs(products: List[Product], seed: int = None, mid: float = 1000.0) -> List:
+    """
+    A market maker and customer flow per product, seeded from seed
+    """
+    rng = random.Random(seed)
+    npcs = []
+    for idx, product in enumerate(products):
+        npcs.append(MarketMakerNPC(product, mid=mid, drift_std=0.3, seed=rng.randrange(2 ** 32),
+                                   name=f"market_maker_{product.ticker}", id_base=5e7 + idx * 1e6))
+        npcs.append(CustomerFlowNPC(product, seed=rng.randrange(2 ** 32), name=f"customer_flow_{product.ticker}",
+                                    id_base=1e7 + idx * 1e6))
+    return npcs
+
+
+class OpenGame:
+    """
+    The game loop itself. bots is the turn order, and should include the player bot. With analytics=True the
+    exchange keeps its trade log and the best bid/ask of every ticker is recorded each timestep (self.history)
+    """
+    def __init__(self, products: List[Product], bots: List, analytics: bool = False):
+        self.products = products
+        self.bots = bots
+        self.analytics = analytics
+        self.exchange = Exchange(products) if analytics else FastExchange(products)
+        self.history = {p.ticker: [] for p in products}  # ticker → [(best bid, best ask)] per timestep
+        self.timestep = 0
+
+    def step(self):
+        exchange = self.exchange
+        for bot in self.bots:
+            trades = exchange.process_batch(bot.send_messages(exchange.book) or [])
+            if trades:
+                for other in self.bots:
+                    other.process_trades(trades)
+        if self.analytics:
+            for ticker, sides in exchange.book.items():
+                bids, asks = sides["Bids"], sides["Asks"]
+                self.history[ticker].append((bids[0].price if bids else np.nan, asks[0].price if asks else np.nan))
+        self.timestep += 1
+
+    def run(self, num_timestamps: int):
+        for _ in range(num_timestamps):
+            self.step()
+
+    def mid(self, ticker: str) -> float:
+        """
+        The market maker's mid for ticker if one of the bots is a MarketMakerNPC for it, otherwise the book's mid
+        """
+        for bot in self.bots:
+            if isinstance(bot, MarketMakerNPC) and bot.product.ticker == ticker:
+                return bot.mid
+        bids, asks = self.exchange.book[ticker]["Bids"], self.exchange.book[ticker]["Asks"]
+        return (bids[0].price + asks[0].price) / 2 if bids and asks else np.nan
+
+
+def play_open(algo_cls, make_products: Callable[[], List[Product]], num_timestamps: int, seed: int,
+              npcs: Callable[[List[Product], int], List] = default_npcs, player_index: int = None,
+              analytics: bool = False, mm_model: MarketMakerModel = None, stop_rules: StopRules = None) -> Dict:
+    """
+    Plays a single open game with a fresh bot, products and NPCs (npcs(products, seed) builds them), seeding random
+    and np.random first like runner.play_one. The player takes its turn at player_index in the bot order (last
+    by default). With stop_rules the game ends early once a checkpoint breaks them, as in runner.play_one.
+
+    Returns a dict with the same core keys as runner.play_one (pnl, positions, fines, turns, time, ...) plus
+    settled_pnl: Cash plus the final positions settled against mm_model at the final mids, minus fines, and the
+    stopped/checkpoints keys of an early-stopped game (whose pnl is then the stopping checkpoint's running PnL)
+    """
+    products = make_products()
+    random.seed(seed)
+    np.random.seed(seed)
+    player_bot = algo_cls(products)
+    tracker = PositionTracker(player_bot, products, stop_rules)
+    bots = list(npcs(products, seed))
+    bots.insert(len(bots) if player_index is None else player_index, player_bot)
+    game = OpenGame(products, bots, analytics=analytics)
+
+    start = time.perf_counter()
+    try:
+        game.run(num_timestamps)
+    except EarlyStopped as stop:
+        stopped = stop.reason
+    else:
+        stopped = None
+    if stopped is not None:
+        pnl = tracker.stopped["pnl"]
+    else:
+        pnl = player_bot.positions["Cash"] if hasattr(player_bot, "positions") else tracker.positions["Cash"]
+    elapsed = time.perf_counter() - start
+    tracker.finish()
+
+    mm_model = mm_model or MarketMakerModel()
+    settlement = sum(mm_model.settlement_value(tracker.positions[p.ticker], game.mid(p.ticker)) for p in products)
+    result = {
+        "seed": seed,
+        "bot": getattr(player_bot, "name", type(player_bot).__name__),
+        "pnl": pnl,
+        "positions": dict(getattr(player_bot, "positions", tracker.positions)),
+        "tracked_positions": tracker.positions,
+        "fines": tracker.fines,
+        "settled_pnl": tracker.positions["Cash"] + settlement - tracker.fines,
+        "turns": tracker.turns,
+        "time": elapsed,
+        "num_timestamps": num_timestamps,
+        "stopped": stopped,
+        "checkpoints": tracker.checkpoints,
+    }
+    if analytics:
+        result["history"] = {ticker: np.array(rows) for ticker, rows in game.history.items()}
+        result["trade_log"] = game.exchange.trade_log
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from play_game import make_products
+    from your_algo import PlayerAlgorithm
+
+    parser = argparse.ArgumentParser(description="Play PlayerAlgorithm in the open game loop against simple NPCs")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1])
+    parser.add_argument("--timestamps", type=int, default=2000)
+    args = parser.parse_args()
+
+    for seed in args.seeds:
+        result = play_open(PlayerAlgorithm, make_products, args.timestamps, seed)
+        print(f"Seed {seed}: PnL {result['pnl']:.2f}, positions {result['positions']}, fines {result['fines']}, "
+              f"settled PnL {result['settled_pnl']:.2f}, {result['time']:.2f}s")
@@ -1,64 +1,133 @@
-import platform
-import sys
+import argparse
 import os
-import pandas as pd
+
 from base import Product
+from profiler import merge_profiles, print_profile
+from result_cache import ResultCache
 from your_algo import PlayerAlgorithm
-
-#====================== Setup OS-specific run_game import ======================
-original_sys_path = sys.path.copy()
-current_dir = os.path.dirname(os.path.abspath(__file__))
-os_name = platform.system()
-
-if os_name == "Linux":
-    sys.path.insert(0, os.path.join(current_dir, "bin/linux_version"))
-    from bin.linux_version.game_setup import run_game
-elif os_name == "Windows":
-    sys.path.insert(0, os.path.join(current_dir, "bin/windows_version"))
-    from bin.windows_version.game_setup import run_game
-elif os_name == "Darwin":
-    sys.path.insert(0, os.path.join(current_dir, "bin/mac_version"))
-    from bin.mac_version.game_setup import run_game
-else:
-    raise ValueError("Unsupported OS")
-
-print("Imports Completed")
-sys.path = original_sys_path
+from runner import (add_stop_arguments, load_run_game, load_seeds, manifest_path, new_seeds, product_params,
+                    read_manifest, replay, run_games, stop_rules_from_args, summarise, write_manifest)
 
 # ====================== Simulation Parameters ======================
 num_markets = 1 # Number of different markets
 num_timestamps = 20000  # Timestamps per market
+num_runs = 5
+num_workers = None  # Games played at once. None → one per CPU core, 1 → one after another in this process
+seeds = None  # e.g. [1, 2, 3] to play fixed market paths, None → fresh random seeds each time
+manifest_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")  # a manifest per game goes here
 
-# Prepare storage for all markets
-all_markets_data = []
 
-# ====================== Run Simulation for Multiple Markets ======================
-num_runs = 5
-all_pnls = []  # store pnl for each run
-all_markets_data = []
-
-for run_idx in range(1, num_runs + 1):
-    print(f"\n========== Run {run_idx}/{num_runs} ==========")
-    
-    for market_idx in range(1, num_markets + 1):
-        print(f"Running market {market_idx}/{num_markets}...")
-        
-        uec = Product("UEC", mpv=0.1, pos_limit=200, fine=20)
-        products = [uec]
-        player_bot = PlayerAlgorithm(products)
-        full_df = run_game(player_bot,num_timestamps,products)
-        pnl = player_bot.positions["Cash"]
-        print(pnl)
-
-    # record pnl for this run
-        all_pnls.append(pnl)
-
-# ====================== Combine All Markets and Save ======================
-
-print("\nPnL results from each run:")
-for i, p in enumerate(all_pnls, start=1):
-    print(f"Run {i}: {p}")
-
-# Example if you want to save:
-# csv_path = os.path.join(current_dir, "Test.csv")
-# full_df.to_csv(csv_path, index=False)
+def make_products():
+    """
+    Builds a fresh set of products for each game
+    """
+    uec = Product("UEC", mpv=0.1, pos_limit=200, fine=20)
+    return [uec]
+
+
+def print_result(result):
+    print(f"Run {result['run'] + 1} (seed {result['seed']}): PnL {result['pnl']}, fines {result['fines']}, "
+          f"{result['time']:.1f}s" + (" (cached)" if result.get("cached") else "")
+          + (f" (stopped at turn {result['turns']}: {result['stopped']})" if result.get("stopped") else ""))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play PlayerAlgorithm from your_algo.py against the NPC bots")
+    parser.add_argument("--runs", type=int, default=num_runs * num_markets, help="games to play with fresh seeds")
+    parser.add_argument("--timestamps", type=int, default=num_timestamps)
+    parser.add_argument("--workers", type=int, default=num_workers, help="games played at once (1 = serial)")
+    parser.add_argument("--verbose", action=argparse.BooleanOptionalAction, default=None,
+                        help="show the bot's and the game's own output (default: only when --workers is 1)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=seeds, help="play exactly these seeds")
+    parser.add_argument("--seed-file", help="read the seeds to play from a file")
+    parser.add_argument("--manifest-dir", default=manifest_dir, help="where each game's manifest is written")
+    parser.add_argument("--no-manifest", action="store_true", help="don't write manifests")
+    parser.add_argument("--record", metavar="DIR", help="stream each game's book to DIR/<bot>_seed<seed>")
+    parser.add_argument("--record-depth", type=int, default=1, help="price levels per side to record")
+    parser.add_argument("--profile", action="store_true", help="time our bot vs the exchange vs the rest of the game")
+    parser.add_argument("--profile-sample", type=int, default=1, help="only time every Nth call (cheaper)")
+    parser.add_argument("--turn-budget", type=float, default=None, metavar="MS",
+                        help="flag send_messages calls slower than this many milliseconds")
+    parser.add_argument("--budget-action", choices=("warn", "fail"), default="warn",
+                        help="warn about turns over --turn-budget, or stop the game")
+    parser.add_argument("--no-cache", action="store_true", help="play every game even if its result is cached")
+    parser.add_argument("--cache-dir", default=None, help="where game results are cached (default .result_cache)")
+    parser.add_argument("--cache-size", type=float, default=64, metavar="MB",
+                        help="least recently used results are dropped beyond this size")
+    add_stop_arguments(parser)
+    parser.add_argument("--replay", help="replay one game, given a manifest file or a seed, and check it matches")
+    return parser.parse_args()
+
+
+def replay_game(args):
+    if os.path.exists(args.replay):
+        manifest = read_manifest(args.replay)
+    else:
+        seed = int(args.replay)
+        path = manifest_path(args.manifest_dir, PlayerAlgorithm(make_products()).name, seed)
+        if os.path.exists(path):
+            manifest = read_manifest(path)
+        else:
+            manifest = {"seed": seed, "num_timestamps": args.timestamps,
+                        "products": [product_params(p) for p in make_products()], "pnl": None, "fines": None}
+
+    print(f"Replaying seed {manifest['seed']} for {manifest['num_timestamps']} timestamps")
+    result = replay(PlayerAlgorithm, manifest)
+    print(f"PnL {result['pnl']}, fines {result['fines']}")
+    if manifest["pnl"] is not None:
+        print("Matches the recorded run" if result["matches"] else
+              f"Does NOT match the recorded run (PnL {manifest['pnl']}, fines {manifest['fines']})")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    load_run_game()
+    print("Imports Completed")
+
+    if args.replay is not None:
+        replay_game(args)
+        raise SystemExit
+
+    # ====================== Run Simulation for Multiple Markets ======================
+    if args.seed_file:
+        run_seeds = load_seeds(args.seed_file)
+    elif args.seeds:
+        run_seeds = args.seeds
+    else:
+        run_seeds = new_seeds(args.runs)
+
+    def on_result(result):
+        print_result(result)
+        if not args.no_manifest:
+            write_manifest(result, args.manifest_dir)
+
+    profile = None
+    if args.profile or args.turn_budget is not None:
+        profile = {"sample_every": args.profile_sample, "budget_action": args.budget_action,
+                   "turn_budget": args.turn_budget / 1000 if args.turn_budget is not None else None}
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_size * 1024 * 1024))
+
+    print(f"\n========== Playing {len(run_seeds)} games ==========")
+    verbose = args.workers == 1 if args.verbose is None else args.verbose
+    results = run_games(PlayerAlgorithm, make_products, args.timestamps, run_seeds, num_workers=args.workers,
+                        quiet=not verbose, on_result=on_result, record_dir=args.record, record_depth=args.record_depth,
+                        profile=profile, cache=cache, stop_rules=stop_rules_from_args(args))
+    if cache is not None and cache.hits:
+        print(f"{cache.hits} of {len(run_seeds)} games were cached (--no-cache to play them all)")
+    all_pnls = [r["pnl"] for r in results]  # store pnl for each run
+
+    # ====================== Combine All Markets and Save ======================
+
+    print("\nPnL results from each run:")
+    for i, p in enumerate(all_pnls, start=1):
+        print(f"Run {i}: {p}")
+
+    summary = summarise(results)
+    print(f"\nMean PnL: {summary['mean_pnl']:.2f}, Std PnL: {summary['std_pnl']:.2f}, "
+          f"E[PnL] - 0.1 * STD[PnL]: {summary['score']:.2f}, Mean fines: {summary['mean_fines']:.2f}")
+    if summary["stopped"]:
+        print(f"{summary['stopped']} of {summary['runs']} games were stopped early; their PnL is where they stopped")
+
+    if profile is not None:
+        print_profile(merge_profiles([r["profile"] for r in results]))
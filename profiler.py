@@ -0,0 +1,253 @@
+import time
+import warnings
+from typing import Dict, List
+
+from base import Exchange
+
+SUB_BUCKET_BITS = 5  # 32 buckets per power of two, so values are binned to within ~3%
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+NUM_BUCKETS = 2 * SUB_BUCKETS + 40 * SUB_BUCKETS  # up to 2^46 ns, about 19 hours
+
+BOT_METHODS = ("send_messages", "process_trades")
+EXCHANGE_METHODS = ("process_order", "remove_order")
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram in nanoseconds: exact below 64ns, then 32 log-linear buckets per power of two, so
+    recording is a few integer operations and percentiles are good to a few percent at any scale
+    """
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, ns: int):
+        if ns < 2 * SUB_BUCKETS:
+            idx = ns
+        else:
+            shift = ns.bit_length() - SUB_BUCKET_BITS - 1
+            idx = shift * SUB_BUCKETS + (ns >> shift)
+        self.counts[min(idx, NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+
+    @staticmethod
+    def bucket_value(idx: int) -> int:
+        """
+        Middle of a bucket's range, in ns
+        """
+        if idx < 2 * SUB_BUCKETS:
+            return idx
+        shift = idx // SUB_BUCKETS - 1
+        low = (idx - shift * SUB_BUCKETS) << shift
+        return low + (1 << shift) // 2
+
+    def percentile(self, q: float) -> int:
+        """
+        The latency (ns) below which q percent of the recorded calls fall
+        """
+        if not self.count:
+            return 0
+        target = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.bucket_value(idx), self.max_ns)
+        return self.max_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for idx, n in enumerate(other.counts):
+            if n:
+                self.counts[idx] += n
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        return self
+
+
+class TurnBudgetExceeded(RuntimeError):
+    pass
+
+
+class TurnProfiler:
+    """
+    Times every call to a bot's send_messages/process_trades and to Exchange.process_order/remove_order into a
+    LatencyHistogram per component, and the whole game's wall time, so it can be broken down into our bot, the
+    exchange, and everything else (the game loop and the NPC bots).
+
+    sample_every=N only times every Nth call of each component (all calls are still counted, and totals are
+    estimated from the sampled mean). With turn_budget (seconds), every send_messages call is timed and any turn over
+    budget is counted; budget_action="warn" warns on the first one, "fail" raises TurnBudgetExceeded out of the game.
+
+    Use as a context manager around run_game, after attach(bot):
+        profiler = TurnProfiler(sample_every=10)
+        profiler.attach(bot)
+        with profiler:
+            run_game(bot, num_timestamps, products)
+        print_profile(profiler.report())
+    """
+    def __init__(self, sample_every: int = 1, turn_budget: float = None, budget_action: str = "warn"):
+        if budget_action not in ("warn", "fail"):
+            raise ValueError(f"Invalid budget_action: {budget_action}. Must be 'warn' or 'fail'.")
+        self.sample_every = max(1, int(sample_every))
+        self.turn_budget_ns = None if turn_budget is None else int(turn_budget * 1e9)
+        self.budget_action = budget_action
+        self.histograms = {name: LatencyHistogram() for name in BOT_METHODS + EXCHANGE_METHODS}
+        self.calls = {name: 0 for name in self.histograms}
+        self.over_budget = 0
+        self.worst_turn_ns = 0
+        self.wall_ns = 0
+        self.bot = None
+        self._start = None
+        self._originals = {}
+
+    def _timed(self, name: str, func):
+        histogram = self.histograms[name]
+        calls = self.calls
+        every = self.sample_every
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            calls[name] += 1
+            if calls[name] % every:
+                return func(*args, **kwargs)
+            start = perf_counter_ns()
+            result = func(*args, **kwargs)
+            histogram.record(perf_counter_ns() - start)
+            return result
+
+        return timed
+
+    def attach(self, bot):
+        """
+        Wraps the bot's send_messages/process_trades. Attach before anything else hooks them (e.g. PositionTracker)
+        so only the bot's own time is measured
+        """
+        self.bot = bot
+        bot.process_trades = self._timed("process_trades", bot.process_trades)
+        if self.turn_budget_ns is None:
+            bot.send_messages = self._timed("send_messages", bot.send_messages)
+            return
+
+        send_messages = bot.send_messages
+        histogram = self.histograms["send_messages"]
+        perf_counter_ns = time.perf_counter_ns
+
+        def budgeted_send_messages(book):
+            self.calls["send_messages"] += 1
+            start = perf_counter_ns()
+            result = send_messages(book)
+            elapsed = perf_counter_ns() - start
+            histogram.record(elapsed)
+            self.worst_turn_ns = max(self.worst_turn_ns, elapsed)
+            if elapsed > self.turn_budget_ns:
+                self._over_budget(elapsed)
+            return result
+
+        bot.send_messages = budgeted_send_messages
+
+    def _over_budget(self, elapsed_ns: int):
+        self.over_budget += 1
+        message = (f"Turn {self.calls['send_messages']} took {elapsed_ns / 1e6:.2f}ms, over the "
+                   f"{self.turn_budget_ns / 1e6:.2f}ms budget")
+        if self.budget_action == "fail":
+            raise TurnBudgetExceeded(message)
+        if self.over_budget == 1:
+            warnings.warn(message + " (further overruns are only counted)", RuntimeWarning, stacklevel=3)
+
+    def detach(self):
+        """
+        Puts the bot's own methods back (along with anything that hooked them after attach)
+        """
+        if self.bot is not None:
+            for name in BOT_METHODS:
+                self.bot.__dict__.pop(name, None)
+            self.bot = None
+
+    def __enter__(self):
+        for name in EXCHANGE_METHODS:
+            self._originals[name] = Exchange.__dict__[name]
+            setattr(Exchange, name, self._timed(name, self._originals[name]))
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_ns += time.perf_counter_ns() - self._start
+        for name, func in self._originals.items():
+            setattr(Exchange, name, func)
+        self._originals = {}
+
+    def report(self) -> Dict:
+        """
+        Picklable summary: calls, histograms, wall time and budget overruns, to pass to merge_profiles/print_profile
+        """
+        return {"calls": dict(self.calls), "histograms": self.histograms, "wall_ns": self.wall_ns,
+                "over_budget": self.over_budget, "worst_turn_ns": self.worst_turn_ns,
+                "turn_budget_ns": self.turn_budget_ns}
+
+
+def merge_profiles(reports: List[Dict]) -> Dict:
+    """
+    Adds up several runs' TurnProfiler reports
+    """
+    merged = {"calls": {}, "histograms": {}, "wall_ns": 0, "over_budget": 0, "worst_turn_ns": 0,
+              "turn_budget_ns": None}
+    for report in reports:
+        for name, calls in report["calls"].items():
+            merged["calls"][name] = merged["calls"].get(name, 0) + calls
+            merged["histograms"].setdefault(name, LatencyHistogram()).merge(report["histograms"][name])
+        merged["wall_ns"] += report["wall_ns"]
+        merged["over_budget"] += report["over_budget"]
+        merged["worst_turn_ns"] = max(merged["worst_turn_ns"], report["worst_turn_ns"])
+        merged["turn_budget_ns"] = merged["turn_budget_ns"] or report["turn_budget_ns"]
+    return merged
+
+
+def breakdown(report: Dict) -> Dict[str, Dict]:
+    """
+    Per component: calls, estimated total seconds, share of wall time and mean/p50/p99/max latency in microseconds.
+    "other" is the wall time not spent in any measured component (game loop, NPC bots)
+    """
+    rows = {}
+    measured_ns = 0
+    for name, histogram in report["histograms"].items():
+        calls = report["calls"][name]
+        total_ns = histogram.mean_ns * calls  # scaled up from the sampled calls
+        measured_ns += total_ns
+        rows[name] = {"calls": calls, "sampled": histogram.count, "total_s": total_ns / 1e9,
+                      "mean_us": histogram.mean_ns / 1e3, "p50_us": histogram.percentile(50) / 1e3,
+                      "p99_us": histogram.percentile(99) / 1e3, "max_us": histogram.max_ns / 1e3}
+    rows["other"] = {"calls": None, "sampled": None, "total_s": max(report["wall_ns"] - measured_ns, 0) / 1e9}
+    wall_s = report["wall_ns"] / 1e9
+    for row in rows.values():
+        row["share"] = row["total_s"] / wall_s if wall_s else 0.0
+    return rows
+
+
+def print_profile(report: Dict):
+    print(f"\nTime breakdown over {report['wall_ns'] / 1e9:.1f}s of game time:")
+    print(f"  {'component':<16}{'calls':>10}{'total s':>10}{'share':>8}{'mean us':>10}{'p50 us':>10}"
+          f"{'p99 us':>10}{'max us':>11}")
+    for name, row in breakdown(report).items():
+        if row["calls"] is None:
+            print(f"  {name:<16}{'':>10}{row['total_s']:>10.2f}{row['share']:>8.1%}")
+            continue
+        print(f"  {name:<16}{row['calls']:>10}{row['total_s']:>10.2f}{row['share']:>8.1%}{row['mean_us']:>10.1f}"
+              f"{row['p50_us']:>10.1f}{row['p99_us']:>10.1f}{row['max_us']:>11.1f}")
+    if report["turn_budget_ns"] is not None:
+        print(f"  {report['over_budget']} turns over the {report['turn_budget_ns'] / 1e6:.2f}ms budget, "
+              f"slowest turn {report['worst_turn_ns'] / 1e6:.2f}ms")
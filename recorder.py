@@ -0,0 +1,228 @@
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+
+META_FILE = "meta.json"
+
+
+class BookRecorder:
+    """
+    Streams per-timestep book snapshots to disk while a game runs, instead of holding them all in a DataFrame.
+
+    Every row is one ticker at one timestep: market, timestep, ticker code, and the price/size of the best depth bid
+    and ask levels (NaN price and 0 size where a side has fewer levels). Each column is its own raw binary file in
+    path/, appended to chunk_size rows at a time, and meta.json records the dtypes and how many rows are complete, so
+    the recording can be memory-mapped with open_recording, even while it is still being written.
+
+    A recording already in path is replaced, unless append is set, in which case the new rows carry on after it
+    (its tickers and depth must match)
+    """
+    def __init__(self, path: str, tickers: List[str], depth: int = 1, chunk_size: int = 4096, market: int = 1,
+                 append: bool = False):
+        self.path = path
+        self.tickers = list(tickers)
+        self.ticker_codes = {ticker: code for code, ticker in enumerate(self.tickers)}
+        self.depth = depth
+        self.chunk_size = chunk_size
+        self.market = market
+        self.timestep = 0
+        self.rows = 0  # rows written to disk
+
+        self.dtypes = {"market": np.int32, "timestep": np.int64, "ticker": np.int16,
+                       "bid_price": np.float64, "bid_size": np.int64, "ask_price": np.float64, "ask_size": np.int64}
+        self.widths = {name: (depth if name.startswith(("bid_", "ask_")) else 1) for name in self.dtypes}
+        self.buffers = {name: np.empty((chunk_size,) if self.widths[name] == 1 else (chunk_size, depth), dtype=dtype)
+                        for name, dtype in self.dtypes.items()}
+        self.buffered = 0
+
+        os.makedirs(path, exist_ok=True)
+        if not append:
+            for name in self.dtypes:
+                column_path = os.path.join(path, f"{name}.bin")
+                if os.path.exists(column_path):
+                    os.remove(column_path)
+        elif os.path.exists(os.path.join(path, META_FILE)):
+            meta = read_meta(path)
+            if meta["tickers"] != self.tickers or meta["depth"] != depth:
+                raise ValueError(f"{path} already holds a recording with different tickers or depth.")
+            self.rows = meta["rows"]
+            self.timestep = meta["timesteps"]
+        self._write_meta()
+
+    def record(self, book: Dict) -> None:
+        """
+        Appends one snapshot row per ticker from a book dict ({ticker: {"Bids": ..., "Asks": ...}})
+        """
+        for ticker in self.tickers:
+            if self.buffered == self.chunk_size:
+                self.flush()
+            row = self.buffered
+            self.buffers["market"][row] = self.market
+            self.buffers["timestep"][row] = self.timestep
+            self.buffers["ticker"][row] = self.ticker_codes[ticker]
+            self._fill_side(book[ticker]["Bids"], self.buffers["bid_price"], self.buffers["bid_size"], row)
+            self._fill_side(book[ticker]["Asks"], self.buffers["ask_price"], self.buffers["ask_size"], row)
+            self.buffered += 1
+        self.timestep += 1
+
+    def _fill_side(self, side, prices: np.ndarray, sizes: np.ndarray, row: int) -> None:
+        if self.depth == 1:
+            level = next(_levels(side), None)
+            prices[row], sizes[row] = level if level is not None else (np.nan, 0)
+            return
+        prices[row] = np.nan
+        sizes[row] = 0
+        for idx, (price, size) in enumerate(_levels(side)):
+            if idx == self.depth:
+                break
+            prices[row, idx], sizes[row, idx] = price, size
+
+    def flush(self) -> None:
+        """
+        Appends the buffered rows to the column files and updates meta.json
+        """
+        if not self.buffered:
+            return
+        for name, buffer in self.buffers.items():
+            with open(os.path.join(self.path, f"{name}.bin"), "ab") as f:
+                buffer[:self.buffered].tofile(f)
+        self.rows += self.buffered
+        self.buffered = 0
+        self._write_meta()
+
+    def close(self) -> None:
+        self.flush()
+
+    def attach(self, bot) -> None:
+        """
+        Hooks bot.send_messages so the book it is handed each turn gets recorded first
+        """
+        send_messages = bot.send_messages
+
+        def recording_send_messages(book):
+            self.record(book)
+            return send_messages(book)
+
+        bot.send_messages = recording_send_messages
+
+    def _write_meta(self) -> None:
+        write_meta(self.path, {
+            "tickers": self.tickers,
+            "depth": self.depth,
+            "rows": self.rows,
+            "timesteps": self.rows // max(len(self.tickers), 1),
+            "columns": {name: {"dtype": np.dtype(dtype).str, "width": self.widths[name]}
+                        for name, dtype in self.dtypes.items()},
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _levels(side):
+    """
+    (price, total size) per price level, most aggressive first, of one side of a book (a BookSide or a plain list of
+    Rests), read lazily so only the levels asked for are walked
+    """
+    price, size = None, 0
+    for rest in side:
+        if rest.price != price and price is not None:
+            yield price, size
+            size = 0
+        price = rest.price
+        size += rest.size
+    if price is not None:
+        yield price, size
+
+
+def write_meta(path: str, meta: Dict) -> None:
+    """
+    Replaces path/meta.json atomically, so readers never see a half-written one
+    """
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def read_meta(path: str) -> Dict:
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+class Recording:
+    """
+    Read-only view of a BookRecorder folder. self.columns holds a np.memmap per column (2D for depth > 1), so nothing
+    is read from disk until it is used
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.meta = read_meta(path)
+        self.tickers = self.meta["tickers"]
+        self.depth = self.meta["depth"]
+        self.rows = self.meta["rows"]
+        self.columns = {}
+        for name, info in self.meta["columns"].items():
+            shape = (self.rows,) if info["width"] == 1 else (self.rows, info["width"])
+            if self.rows == 0:
+                self.columns[name] = np.empty(shape, dtype=info["dtype"])
+            else:
+                self.columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=info["dtype"], mode="r",
+                                               shape=shape)
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def empty_bids(self) -> np.ndarray:
+        """
+        Mask of rows where the bid side of the book was empty (NaN best bid)
+        """
+        bids = self.columns["bid_price"]
+        return np.isnan(bids if bids.ndim == 1 else bids[:, 0])
+
+    @property
+    def empty_asks(self) -> np.ndarray:
+        asks = self.columns["ask_price"]
+        return np.isnan(asks if asks.ndim == 1 else asks[:, 0])
+
+    def markets(self) -> np.ndarray:
+        return np.unique(self.columns["market"])
+
+    def select(self, ticker: str = None, market: int = None) -> Dict[str, np.ndarray]:
+        """
+        The columns for a single ticker and/or market (a copy, unless neither filter removes any rows)
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        if ticker is not None and len(self.tickers) > 1:
+            mask &= self.columns["ticker"] == self.tickers.index(ticker)
+        if market is not None:
+            mask &= self.columns["market"] == market
+        if mask.all():
+            return dict(self.columns)
+        return {name: column[mask] for name, column in self.columns.items()}
+
+    def ticker(self, ticker: str) -> Dict[str, np.ndarray]:
+        return self.select(ticker=ticker)
+
+    def to_frame(self, ticker: str = None, market: int = None):
+        """
+        Top of book in the same Market, Bids, Asks layout as Prices.csv / AllMarkets.csv
+        """
+        import pandas as pd
+
+        cols = self.select(ticker or self.tickers[0], market)
+        bids, asks = cols["bid_price"], cols["ask_price"]
+        if bids.ndim == 2:
+            bids, asks = bids[:, 0], asks[:, 0]
+        return pd.DataFrame({"Market": cols["market"], "Bids": bids, "Asks": asks}, copy=False)
+
+
+def open_recording(path: str) -> Recording:
+    return Recording(path)
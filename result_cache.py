@@ -0,0 +1,129 @@
+"""
+On-disk cache of game results. The game is deterministic given the bot's code, the products, num_timestamps and
+the seed, so a game already played with all four unchanged can be answered from disk instead of played again.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List
+
+from base import Product
+from runner import product_params
+
+CACHED_KEYS = ("seed", "bot", "pnl", "result", "positions", "tracked_positions", "fines", "turns", "time",
+               "num_timestamps", "products")
+
+
+def algo_source_hash(algo_cls) -> str:
+    """
+    Hash of the source of the module algo_cls is defined in and of the modules next to it that it uses (e.g.
+    signals.py), so results from an edited bot are not reused. A functools.partial hashes its function's module
+    """
+    module = inspect.getmodule(getattr(algo_cls, "func", algo_cls))
+    folder = os.path.dirname(os.path.abspath(module.__file__))
+    modules = {module}
+    for value in vars(module).values():
+        used = inspect.getmodule(value)
+        if getattr(used, "__file__", None) and os.path.dirname(os.path.abspath(used.__file__)) == folder:
+            modules.add(used)
+    digest = hashlib.sha1()
+    for used in sorted(modules, key=lambda m: m.__name__):
+        digest.update(inspect.getsource(used).encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(algo_cls, products: List[Product], num_timestamps: int, seed: int) -> str:
+    """
+    Key of one game: the bot's source hash and keyword arguments (if it is a functools.partial), the product
+    parameters, num_timestamps and the seed
+    """
+    keywords = algo_cls.keywords if isinstance(algo_cls, functools.partial) else {}
+    parts = [algo_source_hash(algo_cls), keywords, [product_params(p) for p in products], num_timestamps, seed]
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    One JSON file per game under cache_dir, named by cache_key. Reads and writes refresh an entry's modification
+    time, and once the files add up to more than max_bytes the least recently used ones are deleted
+    """
+    def __init__(self, cache_dir: str = None, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        # name → size, least recently used first
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        self.entries = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self.total_bytes = sum(self.entries.values())
+
+    def key(self, algo_cls, products: List[Product], num_timestamps: int, seed: int) -> str:
+        return cache_key(algo_cls, products, num_timestamps, seed)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Dict:
+        """
+        The stored result for key, or None
+        """
+        name = f"{key}.json"
+        if name not in self.entries:
+            self.misses += 1
+            return None
+        try:
+            with open(self.path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self._drop(name)
+            self.misses += 1
+            return None
+        os.utime(self.path(key))
+        self.entries.move_to_end(name)
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict):
+        """
+        Stores the reusable parts of a play_one result under key, then evicts down to max_bytes
+        """
+        name = f"{key}.json"
+        entry = {k: result[k] for k in CACHED_KEYS if k in result}
+        # Written to a temporary file first so a half-written entry is never read back as a hit
+        tmp_path = self.path(key) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, default=float)
+        os.replace(tmp_path, self.path(key))
+
+        self.total_bytes -= self.entries.pop(name, 0)
+        self.entries[name] = os.path.getsize(self.path(key))
+        self.total_bytes += self.entries[name]
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, name: str):
+        self.total_bytes -= self.entries.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in list(self.entries):
+            self._drop(name)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), ".result_cache")
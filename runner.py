@@ -0,0 +1,444 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from base import DIRECTIONS, Exchange, Product
+from profiler import TurnBudgetExceeded, TurnProfiler
+from recorder import BookRecorder
+
+_run_game = None
+
+
+def load_run_game():
+    """
+    Imports the OS-specific run_game from bin/ (once per process)
+    """
+    global _run_game
+    if _run_game is not None:
+        return _run_game
+
+    original_sys_path = sys.path.copy()
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    os_name = platform.system()
+
+    if os_name == "Linux":
+        sys.path.insert(0, os.path.join(current_dir, "bin/linux_version"))
+        from bin.linux_version.game_setup import run_game
+    elif os_name == "Windows":
+        sys.path.insert(0, os.path.join(current_dir, "bin/windows_version"))
+        from bin.windows_version.game_setup import run_game
+    elif os_name == "Darwin":
+        sys.path.insert(0, os.path.join(current_dir, "bin/mac_version"))
+        from bin.mac_version.game_setup import run_game
+    else:
+        raise ValueError("Unsupported OS")
+
+    sys.path = original_sys_path
+    _run_game = run_game
+    return run_game
+
+
+class EarlyStopped(RuntimeError):
+    """
+    Raised out of the game by PositionTracker when a run crosses one of its StopRules
+    """
+    def __init__(self, reason: str, state: Dict):
+        super().__init__(f"Stopped at turn {state['turn']}: {reason}")
+        self.reason = reason
+        self.state = state
+
+
+class StopRules:
+    """
+    Early-stopping thresholds, checked by PositionTracker every check_every turns once min_turns have been played.
+    A run is stopped once its running PnL (cash plus positions marked at the book's mid, minus fines) is below
+    -max_loss, its fines are over max_fines, or any position is beyond +/- max_position. None turns a rule off
+    """
+    def __init__(self, check_every: int = 500, min_turns: int = 0, max_loss: float = None, max_fines: float = None,
+                 max_position: int = None):
+        self.check_every = check_every
+        self.min_turns = min_turns
+        self.max_loss = max_loss
+        self.max_fines = max_fines
+        self.max_position = max_position
+
+    def due(self, turn: int) -> bool:
+        return turn >= self.min_turns and turn % self.check_every == 0
+
+    def check(self, state: Dict) -> str:
+        """
+        Why the run should stop given a PositionTracker checkpoint, or None to carry on
+        """
+        if self.max_loss is not None and state["pnl"] < -self.max_loss:
+            return f"PnL {state['pnl']:.2f} below -{self.max_loss}"
+        if self.max_fines is not None and state["fines"] > self.max_fines:
+            return f"fines {state['fines']} over {self.max_fines}"
+        if self.max_position is not None:
+            for ticker, position in state["positions"].items():
+                if ticker != "Cash" and abs(position) > self.max_position:
+                    return f"{ticker} position {position} beyond +/-{self.max_position}"
+        return None
+
+
+def add_stop_arguments(parser):
+    """
+    The StopRules command line flags, shared by play_game.py and sweep.py
+    """
+    group = parser.add_argument_group("early stopping")
+    group.add_argument("--stop-every", type=int, default=500, metavar="TURNS", help="turns between checkpoints")
+    group.add_argument("--max-loss", type=float, default=None, help="stop a game once its running PnL is below -this")
+    group.add_argument("--max-fines", type=float, default=None, help="stop a game once its fines are over this")
+    group.add_argument("--max-position", type=int, default=None,
+                       help="stop a game once a position is beyond +/- this")
+
+
+def stop_rules_from_args(args) -> StopRules:
+    """
+    StopRules from add_stop_arguments' flags, or None if no threshold was given
+    """
+    if args.max_loss is None and args.max_fines is None and args.max_position is None:
+        return None
+    return StopRules(args.stop_every, max_loss=args.max_loss, max_fines=args.max_fines,
+                     max_position=args.max_position)
+
+
+class PositionTracker:
+    """
+    Hooks a bot's send_messages/process_trades to follow its real position and cash from the trades the game sends
+    it, and adds up position-limit fines the way the game charges them: fine per unit over pos_limit at the end of
+    every cycle. A cycle ends just before the bot's next turn, and once more when the game finishes.
+
+    With stop_rules, a checkpoint (turn, positions, fines and running PnL) is added to self.checkpoints whenever
+    the rules are due, and EarlyStopped is raised from send_messages, ending the game, if the checkpoint breaks them.
+    """
+    def __init__(self, bot, products: List[Product], stop_rules: StopRules = None):
+        self.bot = bot
+        self.name = bot.name
+        self.limits = {p.ticker: (p.pos_limit, p.fine) for p in products if p.pos_limit is not None}
+        self.positions = {p.ticker: 0 for p in products}
+        self.positions["Cash"] = 0
+        self.fines = 0
+        self.turns = 0
+        self.stop_rules = stop_rules
+        self.marks = {p.ticker: 0.0 for p in products}  # last mid seen per ticker, for running PnL
+        self.checkpoints = []
+        self.stopped = None  # the checkpoint that stopped the run, if one did
+        self.book = None  # the book the bot was last handed
+
+        self._send_messages = bot.send_messages
+        self._process_trades = bot.process_trades
+        bot.send_messages = self.send_messages
+        bot.process_trades = self.process_trades
+
+    def send_messages(self, book):
+        self.book = book
+        if self.turns:
+            self.charge_fines()
+            if self.stop_rules is not None and self.stop_rules.due(self.turns):
+                state = self.checkpoint(book)
+                reason = self.stop_rules.check(state)
+                if reason is not None:
+                    self.stopped = state
+                    raise EarlyStopped(reason, state)
+        self.turns += 1
+        return self._send_messages(book)
+
+    def checkpoint(self, book) -> Dict:
+        """
+        Records and returns the run's state so far, marking positions at each ticker's mid (or its last known mid
+        if a side of its book is empty)
+        """
+        for ticker in self.marks:
+            sides = book.get(ticker)
+            if sides and sides["Bids"] and sides["Asks"]:
+                self.marks[ticker] = (sides["Bids"][0].price + sides["Asks"][0].price) / 2
+        value = sum(self.positions[ticker] * mark for ticker, mark in self.marks.items())
+        state = {"turn": self.turns, "positions": dict(self.positions), "fines": self.fines,
+                 "pnl": self.positions["Cash"] + value - self.fines}
+        self.checkpoints.append(state)
+        return state
+
+    def process_trades(self, trades):
+        for trade in trades:
+            if trade.agg_bot == self.name:
+                sign = DIRECTIONS[trade.agg_dir]
+            elif trade.rest_bot == self.name:
+                sign = -DIRECTIONS[trade.agg_dir]
+            else:
+                continue
+            self.positions[trade.ticker] += trade.size * sign
+            self.positions["Cash"] -= trade.size * trade.price * sign
+        return self._process_trades(trades)
+
+    def charge_fines(self):
+        for ticker, (limit, fine) in self.limits.items():
+            over = abs(self.positions[ticker]) - limit
+            if over > 0:
+                self.fines += over * fine
+
+    def finish(self):
+        """
+        Charges the final cycle's fines (already charged if the run was stopped) and puts the bot's own methods back
+        """
+        if self.stopped is None:
+            self.charge_fines()
+        del self.bot.send_messages
+        del self.bot.process_trades
+
+
+def attach_delta_feed(bot):
+    """
+    Hooks bot.send_messages so that each turn bot.process_deltas(deltas) is called first with the BookDeltas since
+    its previous turn. They come from the DeltaLog the book's BookSides point to, which the exchange only keeps with
+    Exchange.record_deltas set (play_one does that for bots with a process_deltas method)
+    """
+    send_messages = bot.send_messages
+    last_seq = 0
+
+    def send_messages_with_deltas(book):
+        nonlocal last_seq
+        log = next((sides["Bids"].deltas for sides in book.values() if hasattr(sides["Bids"], "deltas")), None)
+        if log is not None:
+            bot.process_deltas(log.since(last_seq))
+            last_seq = log.last_seq
+        return send_messages(book)
+
+    bot.send_messages = send_messages_with_deltas
+
+
+def play_one(algo_cls, make_products: Callable[[], List[Product]], num_timestamps: int, seed: int,
+             run_idx: int = 0, quiet: bool = True, record_dir: str = None, record_depth: int = 1,
+             profile: Dict = None, stop_rules: StopRules = None) -> Dict:
+    """
+    Plays a single game with a fresh bot and fresh products, seeding random and np.random with seed first so the
+    NPC bots follow the same paths every time the seed is reused. With record_dir, the book the bot sees each
+    timestep is streamed to record_dir/<bot>_seed<seed> by a BookRecorder. With profile (a dict of TurnProfiler
+    arguments, {} for the defaults), the game is profiled and the TurnProfiler report is returned under "profile".
+    A bot with a process_deltas method gets the book changes since its last turn through it (attach_delta_feed).
+    With stop_rules, the game is abandoned as soon as a checkpoint breaks them (see StopRules), and likewise when a
+    profile with budget_action="fail" raises TurnBudgetExceeded.
+
+    Returns a dict of per-run stats: pnl (the bot's Cash, what play_game.py has always printed), result (what
+    run_game returns), the bot's positions, the fines tracked by PositionTracker, turns and wall time. A stopped
+    game returns the same stats as they stood when it stopped, with result None, stopped set to the reason
+    (None for a finished game) and the StopRules checkpoints under checkpoints. Its pnl is the checkpoint's
+    running PnL (cash plus positions at the mid, minus fines) rather than Cash, which says little about a game
+    abandoned with positions still open
+    """
+    run_game = load_run_game()
+
+    products = make_products()
+    player_bot = algo_cls(products)
+    profiler = None
+    if profile is not None:
+        profiler = TurnProfiler(**profile)
+        profiler.attach(player_bot)  # first, so only the bot's own time is measured
+    tracker = PositionTracker(player_bot, products, stop_rules)
+    wants_deltas = callable(getattr(player_bot, "process_deltas", None))
+    if wants_deltas:
+        attach_delta_feed(player_bot)
+    recorder = None
+    if record_dir is not None:
+        recorder = BookRecorder(os.path.join(record_dir, f"{player_bot.name}_seed{seed}"),
+                                [p.ticker for p in products], depth=record_depth, market=run_idx + 1)
+        recorder.attach(player_bot)
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        if profiler is not None:
+            stack.enter_context(profiler)
+        if wants_deltas:
+            stack.callback(setattr, Exchange, "record_deltas", Exchange.record_deltas)
+            Exchange.record_deltas = True
+        try:
+            result = run_game(player_bot, num_timestamps, products)
+        except EarlyStopped as stop:
+            result, stopped, pnl = None, stop.reason, stop.state["pnl"]
+        except TurnBudgetExceeded as exceeded:
+            result, stopped, pnl = None, str(exceeded), None
+        else:
+            stopped = None
+    elapsed = time.perf_counter() - start
+    tracker.finish()
+    if stopped is None:
+        pnl = player_bot.positions["Cash"]
+    elif pnl is None:
+        pnl = tracker.checkpoint(tracker.book)["pnl"]  # after finish, so the cycle's fines are in it
+    if recorder is not None:
+        recorder.close()
+
+    return {
+        "run": run_idx,
+        "seed": seed,
+        "bot": getattr(player_bot, "name", type(player_bot).__name__),
+        "pnl": pnl,
+        "result": result,
+        "positions": dict(player_bot.positions),
+        "tracked_positions": tracker.positions,
+        "fines": tracker.fines,
+        "turns": tracker.turns,
+        "time": elapsed,
+        "num_timestamps": num_timestamps,
+        "products": [product_params(p) for p in products],
+        "profile": profiler.report() if profiler is not None else None,
+        "stopped": stopped,
+        "checkpoints": tracker.checkpoints,
+    }
+
+
+def product_params(product: Product) -> Dict:
+    """
+    The constructor arguments of a Product, so it can be written to a manifest and rebuilt with Product(**params)
+    """
+    return {"ticker": product.ticker, "mpv": product.mpv, "lot_size": product.lot_size,
+            "pos_limit": product.pos_limit, "min_price": product.min_price, "max_price": product.max_price,
+            "conversions": product.conversions, "fine": product.fine}
+
+
+def new_seeds(n: int) -> List[int]:
+    """
+    Draws n seeds in the same range the game draws its own from
+    """
+    rng = random.SystemRandom()
+    return [rng.randint(0, 10000000) for _ in range(n)]
+
+
+def load_seeds(path: str) -> List[int]:
+    """
+    Reads seeds from a file: either a JSON list, or one seed per line (blank lines and # comments are skipped)
+    """
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return [int(seed) for seed in json.loads(text)]
+    seeds = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            seeds.append(int(line))
+    return seeds
+
+
+def manifest_path(manifest_dir: str, bot: str, seed: int) -> str:
+    return os.path.join(manifest_dir, f"{bot}_seed{seed}.json")
+
+
+def write_manifest(result: Dict, manifest_dir: str) -> str:
+    """
+    Writes a play_one result as a small JSON manifest (seed, parameters, bot name and PnL summary) and returns its path
+    """
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = manifest_path(manifest_dir, result["bot"], result["seed"])
+    manifest = {key: value for key, value in result.items() if key not in ("run", "profile")}
+    manifest["written"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, default=float)
+    return path
+
+
+def read_manifest(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def replay(algo_cls, manifest: Dict, quiet: bool = False) -> Dict:
+    """
+    Plays a manifest's game again with the same seed, timestamps and products. Returns the new play_one result with
+    "matches" set to whether the PnL and fines came out the same as recorded
+    """
+    def make_products():
+        return [Product(**params) for params in manifest["products"]]
+
+    result = play_one(algo_cls, make_products, manifest["num_timestamps"], manifest["seed"], quiet=quiet)
+    result["matches"] = result["pnl"] == manifest["pnl"] and result["fines"] == manifest["fines"]
+    return result
+
+
+def run_games(algo_cls, make_products: Callable[[], List[Product]], num_timestamps: int, seeds: List[int],
+              num_workers: int = None, quiet: bool = True, on_result: Callable[[Dict], None] = None,
+              record_dir: str = None, record_depth: int = 1, profile: Dict = None, cache=None,
+              stop_rules: StopRules = None) -> List[Dict]:
+    """
+    Plays one game per seed and returns their play_one stats in seed order.
+
+    With num_workers=1 the games are played one after another in this process, otherwise they are fanned out over a
+    ProcessPoolExecutor (num_workers=None uses one worker per core). algo_cls and make_products need to be defined at
+    module level so the workers can import them. on_result is called with each run's stats as it finishes.
+    record_dir/record_depth/profile/stop_rules are passed on to play_one.
+
+    With a result_cache.ResultCache, games already played with the same bot source, products, num_timestamps and
+    seed are taken from the cache (marked "cached": True) and new ones are added to it. Recorded, profiled and
+    early-stopped games always play, as the recording, profile or checkpoints are what they are for
+    """
+    results = [None] * len(seeds)
+    if record_dir is not None or profile is not None or stop_rules is not None:
+        cache = None
+    keys = {}
+
+    def finish(run_idx: int, result: Dict):
+        results[run_idx] = result
+        if cache is not None and not result.get("cached"):
+            cache.put(keys[run_idx], result)
+        if on_result is not None:
+            on_result(result)
+
+    to_play = []
+    for run_idx, seed in enumerate(seeds):
+        if cache is not None:
+            keys[run_idx] = cache.key(algo_cls, make_products(), num_timestamps, seed)
+            cached = cache.get(keys[run_idx])
+            if cached is not None:
+                finish(run_idx, {**cached, "run": run_idx, "profile": None, "cached": True})
+                continue
+        to_play.append((run_idx, seed))
+
+    if num_workers == 1:
+        for run_idx, seed in to_play:
+            finish(run_idx, play_one(algo_cls, make_products, num_timestamps, seed, run_idx, quiet,
+                                     record_dir, record_depth, profile, stop_rules))
+        return results
+
+    if to_play:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            futures = {pool.submit(play_one, algo_cls, make_products, num_timestamps, seed, run_idx, quiet,
+                                   record_dir, record_depth, profile, stop_rules): run_idx
+                       for run_idx, seed in to_play}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+    return results
+
+
+def summarise(results: List[Dict]) -> Dict:
+    """
+    Mean/std of PnL (and fines) across runs, plus the E[PnL] - 0.1 * STD[PnL] score from the README. Early-stopped
+    runs count with the running PnL they had when stopped (positions marked at the mid, see play_one), and are
+    counted under "stopped"
+    """
+    pnls = np.array([r["pnl"] for r in results], dtype=float)
+    fines = np.array([r["fines"] for r in results], dtype=float)
+    mean = float(pnls.mean()) if len(pnls) else float("nan")
+    std = float(pnls.std(ddof=1)) if len(pnls) > 1 else 0.0
+    return {
+        "runs": len(results),
+        "mean_pnl": mean,
+        "std_pnl": std,
+        "score": mean - 0.1 * std,
+        "mean_fines": float(fines.mean()) if len(fines) else float("nan"),
+        "mean_time": float(np.mean([r["time"] for r in results])) if results else float("nan"),
+        "stopped": sum(1 for r in results if r.get("stopped")),
+    }
+
@@ -0,0 +1,106 @@
+"""
+Closed-form settlement and fines against the market maker described in the README.
+
+The market maker quotes level_size at every level, spacing apart, with width between its best bid and ask, around
+a mid that fades linearly with its net position (fade = spacing / level_size per unit). Trading X units into it
+at once walks n = X // level_size full levels and r = X % level_size of the next, so relative to the touch it
+costs spacing * (level_size * n * (n - 1) / 2 + r * n). Everything here is written in terms of that, and takes
+scalars or NumPy arrays, so hundreds of candidate positions cost one vectorized call.
+"""
+from typing import Dict
+
+import numpy as np
+
+
+class MarketMakerModel:
+    """
+    The market maker's quoting parameters (defaults measured from the current game: 20 size every 1.0, 4 wide)
+    """
+    def __init__(self, level_size: int = 20, spacing: float = 1.0, width: float = 4.0):
+        self.level_size = level_size
+        self.spacing = spacing
+        self.width = width
+
+    @property
+    def fade(self) -> float:
+        """
+        How far the mid moves per unit the market maker trades
+        """
+        return self.spacing / self.level_size
+
+    def walk_cost(self, size):
+        """
+        Extra paid (buying) or given up (selling) beyond the touch price when trading size units at once
+        """
+        size = np.abs(size)
+        full, rest = np.divmod(size, self.level_size)
+        return self.spacing * (self.level_size * full * (full - 1) / 2 + rest * full)
+
+    def trade_cash(self, size, mid):
+        """
+        Cash from trading size units into the market maker at once (size > 0 buys, < 0 sells): negative to buy
+        """
+        size = np.asarray(size, dtype=float)
+        return _unwrap(-(size * mid + np.abs(size) * self.width / 2 + self.walk_cost(size)))
+
+    def settlement_value(self, position, mid):
+        """
+        What a final position is settled for: the cash from trading all of it back into the market maker at mid.
+        NaN mids settle at 0
+        """
+        value = self.trade_cash(-np.asarray(position, dtype=float), mid)
+        return _unwrap(np.where(np.isnan(value), 0.0, value))
+
+    def settlement_price(self, position, mid):
+        """
+        Average price the position settles at (mid where the position is 0)
+        """
+        position = np.asarray(position, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price = np.where(position != 0, self.settlement_value(position, mid) / position, mid)
+        return _unwrap(price)
+
+    def mid_after(self, size, mid):
+        """
+        The market maker's mid once size units have been bought (< 0 sold) from it
+        """
+        return _unwrap(mid + self.fade * np.asarray(size, dtype=float))
+
+
+def _unwrap(x):
+    """
+    Plain floats back out for scalar inputs
+    """
+    return float(x) if np.ndim(x) == 0 else x
+
+
+def fines(position, pos_limit: int, fine: float, cycles: int = 1):
+    """
+    Fines for holding position over pos_limit for cycles cycles
+    """
+    return fine * np.maximum(np.abs(position) - pos_limit, 0) * cycles
+
+
+def cumulative_fines(positions, pos_limit: int, fine: float):
+    """
+    Running total of fines along a path of end-of-cycle positions (axis 0 is time)
+    """
+    return np.cumsum(fines(np.asarray(positions), pos_limit, fine), axis=0)
+
+
+def evaluate_targets(position: int, targets, mid: float, cycles_left: int, pos_limit: int = 200, fine: float = 20,
+                     model: MarketMakerModel = None) -> Dict[str, np.ndarray]:
+    """
+    Scores candidate inventory targets as if we traded from position to each target into the market maker now,
+    held it for the remaining cycles_left cycles, and then settled. Returns arrays lined up with targets:
+    trade_cash, fines, settlement and value (trade_cash - fines + settlement), which ranks the targets: the best
+    one adds the most to final PnL
+    """
+    model = model or MarketMakerModel()
+    targets = np.asarray(targets, dtype=float)
+    trade = targets - position
+    trade_cash = model.trade_cash(trade, mid)
+    held_fines = fines(targets, pos_limit, fine, cycles_left)
+    settlement = model.settlement_value(targets, model.mid_after(trade, mid))
+    return {"trade_cash": trade_cash, "fines": held_fines, "settlement": settlement,
+            "value": trade_cash - held_fines + settlement}
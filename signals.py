@@ -0,0 +1,285 @@
+"""
+Incremental indicators for bots, kept in preallocated NumPy arrays with one column per series (usually one per
+ticker) so that every ticker is updated in a single vectorized step each turn.
+
+Each indicator has an update(...) method taking the newest value of every series as an array and returning the
+indicator for every series. The batch_* functions compute the same indicators over a whole recorded series
+(e.g. Recording.columns from recorder.py) for research.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Ring buffer holding the last window values of num_series series side by side
+    """
+    def __init__(self, num_series: int, window: int):
+        self.window = window
+        self.values = np.zeros((window, num_series))
+        self.pos = 0  # row the next push writes to
+        self.count = 0
+
+    def push(self, x: np.ndarray):
+        """
+        Adds the newest values and returns the ones that dropped out of the window (None while it is still filling)
+        """
+        dropped = None
+        if self.count == self.window:
+            dropped = self.values[self.pos].copy()
+        else:
+            self.count += 1
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        return dropped
+
+    def last(self, lag: int = 0) -> np.ndarray:
+        """
+        The values pushed lag pushes ago (lag=0 is the newest)
+        """
+        return self.values[(self.pos - 1 - lag) % self.window]
+
+
+class RollingStats:
+    """
+    Rolling mean and variance over the last window values, from running sums. NaNs are skipped: each series keeps
+    its own count of the non-NaN values in the window (self.n), the mean is NaN while that is 0 and the variance is
+    0 until it reaches 2
+    """
+    def __init__(self, num_series: int, window: int):
+        self.buffer = RollingWindow(num_series, window)
+        self.n = np.zeros(num_series)
+        self.sum = np.zeros(num_series)
+        self.sum_sq = np.zeros(num_series)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        dropped = self.buffer.push(x)
+        if dropped is not None:
+            missing = np.isnan(dropped)
+            dropped = np.where(missing, 0.0, dropped)
+            self.n -= ~missing
+            self.sum -= dropped
+            self.sum_sq -= dropped ** 2
+        missing = np.isnan(x)
+        x = np.where(missing, 0.0, x)
+        self.n += ~missing
+        self.sum += x
+        self.sum_sq += x ** 2
+        return self.mean
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.divide(self.sum, self.n, out=np.full_like(self.sum, np.nan), where=self.n > 0)
+
+    @property
+    def var(self) -> np.ndarray:
+        """
+        Sample variance (0 until there are two values)
+        """
+        n = self.n
+        return np.divide(np.maximum(n * self.sum_sq - self.sum ** 2, 0), n * (n - 1),
+                         out=np.zeros_like(self.sum), where=n >= 2)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+
+class RollingCorr:
+    """
+    Rolling Pearson correlation of x and y over the last window pairs, from running sums of x, y, x^2, y^2 and xy.
+    Pairs where either value is NaN are skipped (self.n counts the rest per series). 0 where there are fewer than
+    two pairs or either series is flat
+    """
+    def __init__(self, num_series: int, window: int):
+        self.x = RollingWindow(num_series, window)
+        self.y = RollingWindow(num_series, window)
+        self.n = np.zeros(num_series)
+        self.sum_x = np.zeros(num_series)
+        self.sum_y = np.zeros(num_series)
+        self.sum_x2 = np.zeros(num_series)
+        self.sum_y2 = np.zeros(num_series)
+        self.sum_xy = np.zeros(num_series)
+        self.corr = np.zeros(num_series)
+
+    def update(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        x_old = self.x.push(x)
+        y_old = self.y.push(y)
+        if x_old is not None:
+            x_old, y_old, valid = _valid_pairs(x_old, y_old)
+            self.n -= valid
+            self.sum_x -= x_old
+            self.sum_y -= y_old
+            self.sum_x2 -= x_old ** 2
+            self.sum_y2 -= y_old ** 2
+            self.sum_xy -= x_old * y_old
+        x, y, valid = _valid_pairs(x, y)
+        self.n += valid
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_x2 += x ** 2
+        self.sum_y2 += y ** 2
+        self.sum_xy += x * y
+
+        n = self.n
+        numerator = n * self.sum_xy - self.sum_x * self.sum_y
+        denominator = np.sqrt(np.maximum((n * self.sum_x2 - self.sum_x ** 2) * (n * self.sum_y2 - self.sum_y ** 2), 0))
+        self.corr = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=(denominator != 0) & (n >= 2))
+        return self.corr
+
+
+def _valid_pairs(x: np.ndarray, y: np.ndarray):
+    """
+    x and y with both zeroed wherever either is NaN, and the mask of the pairs that were not
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return np.where(valid, x, 0.0), np.where(valid, y, 0.0), valid
+
+
+class EWMA:
+    """
+    Exponentially weighted moving average, value = alpha * x + (1 - alpha) * value. Starts at the first non-NaN value
+    of each series, and NaNs leave the average unchanged
+    """
+    def __init__(self, num_series: int, alpha: float = None, span: float = None):
+        if alpha is None:
+            if span is None:
+                raise ValueError("EWMA needs either alpha or span.")
+            alpha = 2 / (span + 1)
+        self.alpha = alpha
+        self.value = np.full(num_series, np.nan)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        blended = self.alpha * x + (1 - self.alpha) * self.value
+        self.value = np.where(np.isnan(self.value), x, np.where(np.isnan(x), self.value, blended))
+        return self.value
+
+
+class Momentum:
+    """
+    x now minus x lag updates ago, 0 until there is enough history or where either value is missing (NaN)
+    """
+    def __init__(self, num_series: int, lag: int = 1):
+        self.lag = lag
+        self.buffer = RollingWindow(num_series, lag + 1)
+        self.value = np.zeros(num_series)
+
+    def update(self, x: np.ndarray) -> np.ndarray:
+        self.buffer.push(np.asarray(x, dtype=float))
+        if self.buffer.count <= self.lag:
+            self.value = np.zeros(self.buffer.values.shape[1])
+            return self.value
+        diff = self.buffer.last() - self.buffer.last(self.lag)
+        self.value = np.where(np.isnan(diff), 0.0, diff)
+        return self.value
+
+
+def imbalance(bid_size: np.ndarray, ask_size: np.ndarray) -> np.ndarray:
+    """
+    Order book imbalance (bid - ask) / (bid + ask), in [-1, 1], 0 where both sides are empty
+    """
+    bid_size = np.asarray(bid_size, dtype=float)
+    ask_size = np.asarray(ask_size, dtype=float)
+    total = bid_size + ask_size
+    return np.divide(bid_size - ask_size, total, out=np.zeros_like(total), where=total != 0)
+
+
+class BookTops:
+    """
+    Pulls best bid/ask price and size for a fixed list of tickers out of a book dict into arrays, plus mid and
+    imbalance. Empty sides give NaN prices and 0 sizes
+    """
+    def __init__(self, tickers: List[str]):
+        self.tickers = list(tickers)
+        n = len(self.tickers)
+        self.bid = np.full(n, np.nan)
+        self.ask = np.full(n, np.nan)
+        self.bid_size = np.zeros(n)
+        self.ask_size = np.zeros(n)
+
+    def update(self, book: Dict) -> "BookTops":
+        for i, ticker in enumerate(self.tickers):
+            for side, prices, sizes in (("Bids", self.bid, self.bid_size), ("Asks", self.ask, self.ask_size)):
+                orders = book[ticker][side]
+                if not orders:
+                    prices[i], sizes[i] = np.nan, 0
+                    continue
+                top = orders[0]
+                prices[i] = top.price
+                sizes[i] = orders.depth().best_size if hasattr(orders, "depth") else top.size
+        return self
+
+    @property
+    def mid(self) -> np.ndarray:
+        return (self.bid + self.ask) / 2
+
+    @property
+    def imbalance(self) -> np.ndarray:
+        return imbalance(self.bid_size, self.ask_size)
+
+
+# ---------- Batch versions over whole series (axis 0 is time) ----------
+
+def _windowed_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum of the last window values at every timestep (fewer at the start), via a cumulative sum. NaNs must already
+    have been zeroed
+    """
+    csum = np.cumsum(x, axis=0)
+    out = csum.copy()
+    out[window:] -= csum[:-window]
+    return out
+
+
+def batch_rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    missing = np.isnan(x)
+    n = _windowed_sums((~missing).astype(float), window)
+    s = _windowed_sums(np.where(missing, 0.0, x), window)
+    return np.divide(s, n, out=np.full_like(s, np.nan), where=n > 0)
+
+
+def batch_rolling_var(x: np.ndarray, window: int) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    missing = np.isnan(x)
+    x = np.where(missing, 0.0, x)
+    n = _windowed_sums((~missing).astype(float), window)
+    s = _windowed_sums(x, window)
+    s2 = _windowed_sums(x ** 2, window)
+    return np.divide(np.maximum(n * s2 - s ** 2, 0), n * (n - 1), out=np.zeros_like(s), where=n >= 2)
+
+
+def batch_rolling_corr(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    x, y, valid = _valid_pairs(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    n = _windowed_sums(valid.astype(float), window)
+    sx, sy = _windowed_sums(x, window), _windowed_sums(y, window)
+    numerator = n * _windowed_sums(x * y, window) - sx * sy
+    denominator = np.sqrt(np.maximum((n * _windowed_sums(x ** 2, window) - sx ** 2) *
+                                     (n * _windowed_sums(y ** 2, window) - sy ** 2), 0))
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=(denominator != 0) & (n >= 2))
+
+
+def batch_ewma(x: np.ndarray, alpha: float = None, span: float = None) -> np.ndarray:
+    import pandas as pd
+
+    if alpha is None:
+        alpha = 2 / (span + 1)
+    x = np.asarray(x, dtype=float)
+    frame = pd.DataFrame(x.reshape(len(x), -1))
+    return frame.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy().reshape(x.shape)
+
+
+def batch_momentum(x: np.ndarray, lag: int = 1) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    out = np.zeros_like(x)
+    out[lag:] = x[lag:] - x[:-lag]
+    return np.where(np.isnan(out), 0.0, out)
+
+
+def batch_imbalance(bid_size: np.ndarray, ask_size: np.ndarray) -> np.ndarray:
+    return imbalance(bid_size, ask_size)
@@ -0,0 +1,331 @@
+"""
+Hyperparameter sweeps over a bot's settings (PlayerAlgorithm.default_params).
+
+Each configuration is a dict of parameters, passed to the bot as algo_cls(products, **params), and is played on the
+same seeds as every other configuration so their PnLs are compared on identical market paths. Configurations come
+from a grid, random samples, or a small Bayesian optimiser (a Gaussian process with an upper-confidence-bound
+proposal) that picks each next configuration from the results so far.
+
+Every finished (params, seed) game is appended to <out_dir>/results.jsonl together with the hash of the bot's
+source, so an interrupted or extended sweep only plays the games it has not played yet, and editing the bot
+invalidates its old results.
+"""
+import argparse
+import functools
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from result_cache import algo_source_hash
+from runner import StopRules, add_stop_arguments, play_one, stop_rules_from_args, summarise
+
+RECORD_KEYS = ("pnl", "positions", "fines", "settled_pnl", "turns", "time", "stopped")
+
+
+def grid(space: Dict[str, List]) -> List[Dict]:
+    """
+    Every combination of the values listed for each parameter
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def _sample(spec, rng: random.Random):
+    """
+    One value from a parameter spec: a (low, high) tuple is sampled uniformly (as an int if both ends are ints),
+    a list is sampled from its values
+    """
+    if isinstance(spec, tuple):
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return rng.uniform(low, high)
+    return rng.choice(spec)
+
+
+def random_samples(space: Dict, n: int, seed: int = None) -> List[Dict]:
+    """
+    n configurations sampled independently from space (see _sample for the specs)
+    """
+    rng = random.Random(seed)
+    return [{name: _sample(spec, rng) for name, spec in space.items()} for _ in range(n)]
+
+
+class BayesProposer:
+    """
+    Proposes configurations by GP-UCB: a Gaussian process with an RBF kernel is fitted to the scores seen so far
+    (parameters scaled to [0, 1], list parameters by their index), and the next configuration is the one out of
+    num_candidates random samples with the highest mean + kappa * std. The first num_initial proposals are random
+    """
+    def __init__(self, space: Dict, seed: int = None, num_initial: int = 5, kappa: float = 2.0,
+                 length_scale: float = 0.25, noise: float = 1e-2, num_candidates: int = 500):
+        self.space = space
+        self.rng = random.Random(seed)
+        self.num_initial = num_initial
+        self.kappa = kappa
+        self.length_scale = length_scale
+        self.noise = noise
+        self.num_candidates = num_candidates
+        self.configs = []
+        self.scores = []
+
+    def encode(self, params: Dict) -> np.ndarray:
+        point = []
+        for name, spec in self.space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                point.append((params[name] - low) / (high - low) if high != low else 0.0)
+            else:
+                point.append(spec.index(params[name]) / max(len(spec) - 1, 1))
+        return np.array(point)
+
+    def observe(self, params: Dict, score: float):
+        self.configs.append(params)
+        self.scores.append(score)
+
+    def _kernel(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        sq_dist = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-sq_dist / (2 * self.length_scale ** 2))
+
+    def propose(self) -> Dict:
+        if len(self.scores) < self.num_initial:
+            return {name: _sample(spec, self.rng) for name, spec in self.space.items()}
+
+        # Standardised scores, so the prior (mean 0, variance 1) and noise are on the same scale for any PnL range
+        y = np.array(self.scores, dtype=float)
+        y = (y - y.mean()) / (y.std() or 1.0)
+        x = np.array([self.encode(params) for params in self.configs])
+        candidates = [{name: _sample(spec, self.rng) for name, spec in self.space.items()}
+                      for _ in range(self.num_candidates)]
+        xc = np.array([self.encode(params) for params in candidates])
+
+        chol = np.linalg.cholesky(self._kernel(x, x) + self.noise * np.eye(len(x)))
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+        k_star = self._kernel(xc, x)
+        mean = k_star @ alpha
+        v = np.linalg.solve(chol, k_star.T)
+        std = np.sqrt(np.maximum(1.0 - (v ** 2).sum(axis=0), 0.0))
+        return candidates[int(np.argmax(mean + self.kappa * std))]
+
+
+def params_key(params: Dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def run_key(params: Dict, seed: int, num_timestamps: int, backend: str, algo_hash: str,
+            stop_rules: StopRules = None) -> str:
+    rules = vars(stop_rules) if stop_rules is not None else None
+    return json.dumps([params_key(params), seed, num_timestamps, backend, algo_hash, rules], sort_keys=True)
+
+
+def play_config(algo_cls, params: Dict, make_products: Callable, num_timestamps: int, seed: int,
+                backend: str = "game", stop_rules: StopRules = None) -> Dict:
+    """
+    Plays one game of algo_cls built with params, in the real game (backend="game", runner.play_one) or the open
+    game loop (backend="open", open_game.play_open), stopping early if stop_rules are given and broken. Returns the
+    result keys worth keeping in the journal
+    """
+    bot_cls = functools.partial(algo_cls, **params)
+    if backend == "game":
+        result = play_one(bot_cls, make_products, num_timestamps, seed, stop_rules=stop_rules)
+    elif backend == "open":
+        from open_game import play_open
+        result = play_open(bot_cls, make_products, num_timestamps, seed, stop_rules=stop_rules)
+    else:
+        raise ValueError(f"Unknown backend: {backend}. Must be 'game' or 'open'.")
+    return {key: result[key] for key in RECORD_KEYS if key in result}
+
+
+class SweepJournal:
+    """
+    Append-only JSONL log of finished games, indexed by run_key
+    """
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.path = os.path.join(out_dir, "results.jsonl")
+        self.records = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.records
+
+    def get(self, key: str) -> Dict:
+        return self.records.get(key)
+
+    def append(self, record: Dict):
+        self.records[record["key"]] = record
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, default=float) + "\n")
+
+
+def run_sweep(algo_cls, make_products: Callable, configs: List[Dict], seeds: List[int], num_timestamps: int,
+              out_dir: str = "sweeps", backend: str = "game", num_workers: int = None,
+              on_result: Callable[[Dict], None] = None, stop_rules: StopRules = None) -> List[Dict]:
+    """
+    Plays every config on every seed across one ProcessPoolExecutor (num_workers=1 plays them in this process),
+    skipping games already in the journal for the same bot source. Returns the records of all the requested games.
+    algo_cls and make_products need to be defined at module level so the workers can import them.
+
+    With stop_rules, hopeless games are abandoned at the first checkpoint that breaks them and kept as failures
+    (stopped set to the reason) with the running PnL (positions marked at the mid), positions and fines they had
+    reached
+    """
+    journal = SweepJournal(out_dir)
+    algo_hash = algo_source_hash(algo_cls)
+    jobs = {}
+    for params in configs:
+        for seed in seeds:
+            key = run_key(params, seed, num_timestamps, backend, algo_hash, stop_rules)
+            if key not in journal:
+                jobs[key] = (params, seed)
+
+    def finish(key: str, result: Dict):
+        params, seed = jobs[key]
+        record = {"key": key, "params": params, "seed": seed, "num_timestamps": num_timestamps,
+                  "backend": backend, "algo_hash": algo_hash, **result}
+        journal.append(record)
+        if on_result is not None:
+            on_result(record)
+
+    if num_workers == 1:
+        for key, (params, seed) in jobs.items():
+            finish(key, play_config(algo_cls, params, make_products, num_timestamps, seed, backend, stop_rules))
+    elif jobs:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            futures = {pool.submit(play_config, algo_cls, params, make_products, num_timestamps, seed, backend,
+                                   stop_rules): key
+                       for key, (params, seed) in jobs.items()}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    return [journal.get(run_key(params, seed, num_timestamps, backend, algo_hash, stop_rules))
+            for params in configs for seed in seeds]
+
+
+def rank(records: List[Dict], by: str = "score", metric: str = "pnl") -> List[Dict]:
+    """
+    Groups records by params and summarises each group with runner.summarise (metric is the result key used as
+    PnL, e.g. "settled_pnl" for open games), best first by "score" (E[PnL] - 0.1 * STD[PnL]) or "mean_pnl".
+    Stopped runs count with the marked PnL they stopped at, so a config is not flattered by its abandoned games
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(params_key(record["params"]), []).append(record)
+    ranking = []
+    for group in groups.values():
+        summary = summarise([{**record, "pnl": record[metric]} for record in group])
+        ranking.append({"params": group[0]["params"], **summary})
+    ranking.sort(key=lambda row: row[by], reverse=True)
+    return ranking
+
+
+def bayes_sweep(algo_cls, make_products: Callable, space: Dict, num_configs: int, seeds: List[int],
+                num_timestamps: int, out_dir: str = "sweeps", backend: str = "game", num_workers: int = None,
+                seed: int = None, by: str = "score", metric: str = "pnl", stop_rules: StopRules = None,
+                **proposer_args) -> List[Dict]:
+    """
+    num_configs rounds of BayesProposer: each proposed config is played on all seeds (in parallel) and its by
+    statistic is fed back before the next proposal. Returns the records of every game played
+    """
+    proposer = BayesProposer(space, seed=seed, **proposer_args)
+    records = {}
+    for _ in range(num_configs):
+        params = proposer.propose()
+        config_records = run_sweep(algo_cls, make_products, [params], seeds, num_timestamps, out_dir, backend,
+                                   num_workers, stop_rules=stop_rules)
+        proposer.observe(params, rank(config_records, by, metric)[0][by])
+        records.update((record["key"], record) for record in config_records)
+    return list(records.values())
+
+
+def parse_space(specs: List[str]) -> Dict:
+    """
+    Parses name=a,b,c (a list of values) and name=low:high (a range) parameter specs
+    """
+    def value(text: str):
+        for cast in (int, float):
+            try:
+                return cast(text)
+            except ValueError:
+                pass
+        return text
+
+    space = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep:
+            raise ValueError(f"Bad parameter spec {spec!r}: expected name=a,b,c or name=low:high")
+        if ":" in values:
+            low, high = values.split(":", 1)
+            space[name] = (value(low), value(high))
+        else:
+            space[name] = [value(v) for v in values.split(",")]
+    return space
+
+
+def print_ranking(ranking: List[Dict], top: int = 10):
+    for row in ranking[:top]:
+        print(f"  {row['params']}: mean PnL {row['mean_pnl']:.2f}, std {row['std_pnl']:.2f}, "
+              f"E[PnL] - 0.1 * STD[PnL] {row['score']:.2f} ({row['runs']} seeds"
+              + (f", {row['stopped']} stopped early)" if row["stopped"] else ")"))
+
+
+if __name__ == "__main__":
+    from play_game import make_products, num_timestamps
+    from your_algo import PlayerAlgorithm
+
+    parser = argparse.ArgumentParser(description="Sweep PlayerAlgorithm parameters on shared seeds, e.g. "
+                                                 "python sweep.py order_size=3,5,8 rolling_window_size=20,50,100")
+    parser.add_argument("params", nargs="+", help="name=a,b,c (values) or name=low:high (range, random/bayes only)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--random", type=int, metavar="N", help="N random configurations instead of the full grid")
+    mode.add_argument("--bayes", type=int, metavar="N", help="N configurations chosen by Bayesian optimisation")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--timestamps", type=int, default=num_timestamps)
+    parser.add_argument("--backend", choices=("game", "open"), default="game",
+                        help="the real game, or open_game.py's faster stand-in NPCs")
+    parser.add_argument("--workers", type=int, default=None, help="games played at once (1 = serial)")
+    parser.add_argument("--out", default="sweeps", help="folder for the results journal")
+    parser.add_argument("--rank-by", choices=("score", "mean_pnl"), default="score")
+    parser.add_argument("--sample-seed", type=int, default=None, help="seed for random/Bayesian sampling")
+    parser.add_argument("--top", type=int, default=10)
+    add_stop_arguments(parser)
+    args = parser.parse_args()
+
+    space = parse_space(args.params)
+    unknown = set(space) - set(PlayerAlgorithm.default_params)
+    if unknown:
+        parser.error(f"unknown parameters {sorted(unknown)}, expected some of {sorted(PlayerAlgorithm.default_params)}")
+    metric = "settled_pnl" if args.backend == "open" else "pnl"
+    stop_rules = stop_rules_from_args(args)
+
+    def on_result(record):
+        print(f"{record['params']} seed {record['seed']}: PnL {record['pnl']:.2f}, fines {record['fines']}"
+              + (f" (stopped: {record['stopped']})" if record.get("stopped") else ""))
+
+    if args.bayes:
+        records = bayes_sweep(PlayerAlgorithm, make_products, space, args.bayes, args.seeds, args.timestamps,
+                              args.out, args.backend, args.workers, seed=args.sample_seed, by=args.rank_by,
+                              metric=metric, stop_rules=stop_rules)
+    else:
+        if args.random:
+            configs = random_samples(space, args.random, args.sample_seed)
+        elif any(isinstance(spec, tuple) for spec in space.values()):
+            parser.error("ranges (name=low:high) need --random or --bayes; list values for a grid")
+        else:
+            configs = grid(space)
+        records = run_sweep(PlayerAlgorithm, make_products, configs, args.seeds, args.timestamps, args.out,
+                            args.backend, args.workers, on_result, stop_rules)
+
+    print(f"\nBest of {len({params_key(r['params']) for r in records})} configurations ({metric}):")
+    print_ranking(rank(records, args.rank_by, metric), args.top)
@@ -0,0 +1,126 @@
+"""
+Checks BookSide against the original list-of-Rests book it replaced: random streams of orders and
+cancels must give the same trades and the same books, order for order. Run with python -m pytest tests
+"""
+import copy
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import Exchange, Order, Product, Rest  # noqa: E402
+
+
+class ListExchange:
+    """
+    The original Exchange matching logic on plain lists, sorted most aggressive first with FIFO at each price
+    """
+    def __init__(self, tickers):
+        self.book = {ticker: {"Bids": [], "Asks": []} for ticker in tickers}
+        self.order_ids = {}
+
+    def process_order(self, order: Order):
+        trades = []
+        opposing = self.book[order.ticker]["Asks" if order.agg_dir == "Buy" else "Bids"]
+        while order.size > 0 and opposing:
+            rest = opposing[0]
+            if (rest.price > order.price) if order.agg_dir == "Buy" else (rest.price < order.price):
+                break
+            size = min(order.size, rest.size)
+            trades.append((rest.price, size, order.order_id, rest.order_id, order.agg_dir, order.bot_name,
+                           rest.bot_name))
+            order.size -= size
+            rest.size -= size
+            if rest.size == 0:
+                opposing.pop(0)
+        if order.size > 0:
+            self.add_order(order)
+        return trades
+
+    def add_order(self, order: Order):
+        side = "Bids" if order.agg_dir == "Buy" else "Asks"
+        self.order_ids[order.order_id] = (order.ticker, side)
+        rest = Rest(order.size, order.price, order.agg_dir, order.order_id, order.ticker, order.aggness,
+                    order.bot_name)
+        book = self.book[order.ticker][side]
+        idx = 0
+        while idx < len(book) and book[idx].aggness >= order.aggness:
+            idx += 1
+        book.insert(idx, rest)
+
+    def remove_order(self, order_id) -> bool:
+        info = self.order_ids.get(order_id)
+        if not info:
+            return False
+        book = self.book[info[0]][info[1]]
+        for idx, rest in enumerate(book):
+            if rest.order_id == order_id:
+                book.pop(idx)
+                return True
+        return False
+
+
+def snapshot(book):
+    return {ticker: {side: [(r.price, r.size, r.order_id, r.bot_name) for r in rests] for side, rests in sides.items()}
+            for ticker, sides in book.items()}
+
+
+def run_stream(seed: int, steps: int = 3000):
+    rng = random.Random(seed)
+    tickers = ["UEC", "ABC"]
+    exchange = Exchange([Product(ticker, mpv=0.1) for ticker in tickers])
+    reference = ListExchange(tickers)
+    sent = []
+    for order_id in range(steps):
+        if sent and rng.random() < 0.3:
+            cancel_id = rng.choice(sent)
+            assert exchange.remove_order(cancel_id) == reference.remove_order(cancel_id)
+        else:
+            args = (rng.choice(tickers), round(100 + rng.randint(-10, 10) * 0.5, 1), rng.randint(1, 30), order_id,
+                    rng.choice(("Buy", "Sell")), rng.choice(("a", "b", "c")))
+            trades = exchange.process_order(Order(*args))
+            expected = reference.process_order(Order(*args))
+            assert [(t.price, t.size, t.agg_order_id, t.rest_order_id, t.agg_dir, t.agg_bot, t.rest_bot)
+                    for t in trades] == expected
+            sent.append(order_id)
+        if order_id % 50 == 0:
+            assert snapshot(exchange.book) == snapshot(reference.book)
+    assert snapshot(exchange.book) == snapshot(reference.book)
+
+
+def test_matches_list_book():
+    for seed in range(5):
+        run_stream(seed)
+
+
+def test_side_reads_like_a_list():
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    bids, asks = exchange.book["UEC"]["Bids"], exchange.book["UEC"]["Asks"]
+    assert bids == [] and isinstance(bids, list)
+    exchange.process_order(Order("UEC", 99.0, 5, 1, "Buy", "a"))
+    exchange.process_order(Order("UEC", 101.0, 5, 2, "Sell", "a"))
+    assert bids != []
+    assert bids == list(bids) == bids.copy() == bids[:]
+    assert [r.order_id for r in bids + asks] == [1, 2]
+    assert bids.index(bids[0]) == 0 and bids.count(bids[0]) == 1
+    assert copy.deepcopy(bids)[0].order_id == 1
+    with pytest.raises(TypeError):
+        hash(bids)
+    with pytest.raises(TypeError):
+        bids.append(asks[0])
+    assert len(bids) == 1
+
+
+def test_used_ids_are_rejected():
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    exchange.process_order(Order("UEC", 100.0, 5, 1, "Sell", "a"))
+    exchange.process_order(Order("UEC", 100.0, 5, 2, "Buy", "b"))  # fills 1 without ever resting
+    exchange.process_order(Order("UEC", 99.0, 5, 3, "Buy", "b"))
+    exchange.remove_order(3)
+    for order_id in (1, 2, 3):
+        with pytest.raises(ValueError):
+            exchange.process_order(Order("UEC", 90.0, 1, order_id, "Buy", "c"))
+    assert exchange.live_orders == 0 and exchange.retired_orders == 3
@@ -0,0 +1,76 @@
+"""
+Checks that the implied quotes the Exchange's ConversionEngine keeps up to date incrementally match ones worked out
+from scratch from the book after every order and cancel. Run with python -m pytest tests
+"""
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import Exchange, Order, Product  # noqa: E402
+
+NAN = float("nan")
+
+
+def top(rests):
+    if not rests:
+        return NAN, 0
+    price = rests[0].price
+    return price, sum(r.size for r in rests if r.price == price)
+
+
+def implied_from_scratch(book, products):
+    """
+    {ticker: (bid, ask)} and {(src, dst): (implied_bid, implied_ask, profit, size)} straight from the book
+    """
+    edges, quotes = {}, {p.ticker: [NAN, NAN] for p in products}
+    for product in products:
+        for dst, spec in product.conversions.items():
+            ratio, fee = (spec, 0.0) if isinstance(spec, (int, float)) else spec
+            src_ask, src_ask_size = top(book[product.ticker]["Asks"])
+            dst_bid, dst_bid_size = top(book[dst]["Bids"])
+            implied_ask = (src_ask + fee) / ratio if src_ask_size else NAN
+            implied_bid = dst_bid * ratio - fee if dst_bid_size else NAN
+            edges[(product.ticker, dst)] = (implied_bid, implied_ask, implied_bid - src_ask,
+                                            min(src_ask_size, math.floor(dst_bid_size / ratio)))
+            bid, ask = quotes[product.ticker][0], quotes[dst][1]
+            if not math.isnan(implied_bid) and (math.isnan(bid) or implied_bid > bid):
+                quotes[product.ticker][0] = implied_bid
+            if not math.isnan(implied_ask) and (math.isnan(ask) or implied_ask < ask):
+                quotes[dst][1] = implied_ask
+    return quotes, edges
+
+
+def same(a, b):
+    return all((math.isnan(x) and math.isnan(y)) or x == y for x, y in zip(a, b))
+
+
+def test_implied_quotes_match_recomputation():
+    rng = random.Random(0)
+    products = [Product("UEC", mpv=0.1, conversions={"ABC": 2, "XYZ": (0.5, 0.3)}),
+                Product("ABC", mpv=0.1, conversions={"UEC": (0.5, 0.1)}),
+                Product("XYZ", mpv=0.1)]
+    mid = {"UEC": 100.0, "ABC": 50.0, "XYZ": 200.0}
+    exchange = Exchange(products)
+    engine = exchange.conversions
+    sent = []
+    for order_id in range(20000):
+        if sent and rng.random() < 0.35:
+            exchange.remove_order(sent.pop(rng.randrange(len(sent))))
+        else:
+            ticker = rng.choice(list(mid))
+            price = round(mid[ticker] + rng.randint(-10, 10) * 0.1, 1)
+            exchange.process_order(Order(ticker, price, rng.randint(1, 20), order_id, rng.choice(("Buy", "Sell")),
+                                         "a"))
+            sent.append(order_id)
+
+        quotes, edges = implied_from_scratch(exchange.book, products)
+        for ticker, (bid, ask) in quotes.items():
+            assert same((engine.quotes[ticker].bid, engine.quotes[ticker].ask), (bid, ask))
+        for key, expected in edges.items():
+            conversion = engine.pair(*key)
+            assert same((conversion.implied_bid, conversion.implied_ask, conversion.profit, conversion.size),
+                        expected)
+        assert set(engine.arbitrage) == {key for key, (_, _, profit, size) in edges.items() if profit > 0 and size > 0}
@@ -0,0 +1,41 @@
+"""
+Checks BookSide's cached DepthViews against views rebuilt from scratch from the Rests after every book event, and
+that a view handed out earlier never changes. Run with python -m pytest tests
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import Exchange, Order, Product, depth_view  # noqa: E402
+
+
+def levels_of(view):
+    return view.prices, view.sizes, view.cumulative
+
+
+def test_cached_views_match_rebuilt_ones():
+    rng = random.Random(0)
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    sides = exchange.book["UEC"]
+    sent = []
+    held = []  # (view, its levels when it was handed out)
+    for order_id in range(50000):
+        if sent and rng.random() < 0.5:
+            exchange.remove_order(sent.pop(rng.randrange(len(sent))))
+        else:
+            # Mostly passive, sometimes sweeping a few levels
+            direction = rng.choice(("Buy", "Sell"))
+            offset = rng.randint(-3, 12) * 0.1
+            price = round(100 - offset if direction == "Buy" else 100 + offset, 1)
+            exchange.process_order(Order("UEC", price, rng.randint(1, 25), order_id, direction, "a"))
+            sent.append(order_id)
+
+        for side in sides.values():
+            for levels in (1, 3, None):
+                view = side.depth(levels)
+                assert levels_of(view) == levels_of(depth_view(list(side), levels))
+                if rng.random() < 0.01:
+                    held.append((view, levels_of(view)))
+    assert all(levels_of(view) == levels for view, levels in held)
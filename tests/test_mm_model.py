@@ -0,0 +1,64 @@
+"""
+Checks mm_model.simulate against a scalar loop that plays one scenario at a time, filling the market maker's
+levels one by one. Run with python -m pytest tests
+"""
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mm_model import random_noise, simulate  # noqa: E402
+from settlement import MarketMakerModel  # noqa: E402
+
+
+def walk(model: MarketMakerModel, size: float, mid: float, limit: float = math.nan):
+    """
+    (units filled, cash) from trading size into the market maker, level by level, stopping outside limit
+    """
+    direction = 1 if size > 0 else -1
+    filled, cash, level = 0, 0.0, 0
+    while filled < abs(size):
+        price = mid + direction * (model.width / 2 + level * model.spacing)
+        if not math.isnan(limit) and direction * (price - limit) > 0:
+            break
+        units = min(abs(size) - filled, model.level_size)
+        filled += units
+        cash -= direction * units * price
+        level += 1
+    return direction * filled, cash
+
+
+def simulate_loop(orders, mid0, model, limits, noise, start_position, pos_limit, fine):
+    mid, position, cash, fined = mid0, start_position, 0.0, 0.0
+    for t, order in enumerate(orders):
+        filled, traded = walk(model, order, mid, limits[t])
+        cash += traded
+        position += filled
+        fined += fine * max(abs(position) - pos_limit, 0)
+        mid += model.fade * filled + noise[t]
+    _, settlement = walk(model, -position, mid)
+    return position, mid, cash + settlement - fined
+
+
+@pytest.mark.parametrize("with_limits", [False, True])
+def test_matches_scalar_loop(with_limits):
+    rng = np.random.default_rng(0)
+    model = MarketMakerModel(level_size=7, spacing=0.5, width=3.0)
+    orders = rng.integers(-40, 41, size=(50, 60)).astype(float)
+    noise = random_noise(50, 60, seed=1)
+    limits = np.full_like(orders, np.nan)
+    if with_limits:
+        offsets = rng.uniform(-1, 6, size=orders.shape)
+        limits = 1000 + np.sign(orders) * offsets + rng.normal(0, 5, size=orders.shape)
+        limits[rng.random(orders.shape) < 0.3] = np.nan
+    result = simulate(orders, mid0=1000.0, model=model, limits=limits if with_limits else None, mid_noise=noise,
+                      start_position=5, pos_limit=100, fine=2.0)
+    for s in range(len(orders)):
+        position, mid, pnl = simulate_loop(orders[s], 1000.0, model, limits[s], noise[s], 5, 100, 2.0)
+        assert result["positions"][s, -1] == position
+        assert result["mids"][s, -1] == pytest.approx(mid, rel=1e-12)
+        assert result["pnl"][s] == pytest.approx(pnl, rel=1e-9, abs=1e-6)
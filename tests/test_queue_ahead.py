@@ -0,0 +1,58 @@
+"""
+Checks Exchange.queue_ahead against a brute-force walk of the order's price level over random orders, partial
+fills and cancels, including levels whose Fenwick tree has to be renumbered. Run with python -m pytest tests
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import Exchange, Order, Product  # noqa: E402
+
+
+def walk_ahead(side, rest) -> int:
+    total = 0
+    for queued in side:
+        if queued is rest:
+            return total
+        if queued.price == rest.price:
+            total += queued.size
+    raise AssertionError(f"{rest.order_id} is not on its side")
+
+
+def test_matches_brute_force_walk():
+    rng = random.Random(0)
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    sent = []
+    for order_id in range(60000):
+        if sent and rng.random() < 0.35:
+            exchange.remove_order(sent.pop(rng.randrange(len(sent))))
+        else:
+            direction = rng.choice(("Buy", "Sell"))
+            offset = rng.randint(-3, 12) * 0.5
+            price = round(100 - offset if direction == "Buy" else 100 + offset, 1)
+            exchange.process_order(Order("UEC", price, rng.randint(1, 20), order_id, direction, "a"))
+            sent.append(order_id)
+
+        if sent and rng.random() < 0.3:
+            asked = rng.choice(sent)
+            rest = exchange.order_ids.get(asked)
+            if rest is None:
+                assert exchange.queue_ahead(asked) is None
+            else:
+                side = exchange.book["UEC"]["Bids" if rest.direction == 1 else "Asks"]
+                assert exchange.queue_ahead(asked) == walk_ahead(side, rest)
+
+
+def test_long_lived_level_is_renumbered():
+    # Only a handful of orders rest at 99 at any time, but hundreds pass through, so queue positions run out
+    exchange = Exchange([Product("UEC", mpv=0.1)])
+    exchange.process_order(Order("UEC", 99.0, 7, 0, "Buy", "a"))
+    for order_id in range(1, 200):
+        exchange.process_order(Order("UEC", 99.0, order_id, order_id, "Buy", "a"))
+        assert exchange.queue_ahead(order_id) == 7 + sum(range(max(order_id - 3, 1), order_id))
+        if order_id > 3:
+            exchange.remove_order(order_id - 3)
+    assert exchange.queue_ahead(0) == 0
+    assert exchange.queue_ahead(199) == 7 + 197 + 198
@@ -0,0 +1,56 @@
+"""
+Checks settlement.py's closed forms against walking the market maker's book one level at a time, for every
+position in [-400, 400]. Run with python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settlement import MarketMakerModel, cumulative_fines, fines  # noqa: E402
+
+POSITIONS = np.arange(-400, 401)
+
+
+def walk_trade_cash(model: MarketMakerModel, size: int, mid: float) -> float:
+    """
+    Cash from trading size units into the market maker (size > 0 buys), filling each level before the next
+    """
+    direction = 1 if size > 0 else -1
+    cash, left, level = 0.0, abs(size), 0
+    while left:
+        price = mid + direction * (model.width / 2 + level * model.spacing)
+        filled = min(left, model.level_size)
+        cash -= direction * filled * price
+        left -= filled
+        level += 1
+    return cash
+
+
+@pytest.mark.parametrize("model", [MarketMakerModel(), MarketMakerModel(level_size=7, spacing=0.5, width=3.0)])
+def test_settlement_matches_level_walk(model):
+    mid = 101.3
+    expected = np.array([walk_trade_cash(model, -int(position), mid) for position in POSITIONS])
+    np.testing.assert_allclose(model.settlement_value(POSITIONS, mid), expected, rtol=1e-12, atol=1e-9)
+    for position, value in zip(POSITIONS, expected):
+        assert model.settlement_value(int(position), mid) == pytest.approx(value, rel=1e-12, abs=1e-9)
+        assert model.trade_cash(int(position), mid) == pytest.approx(walk_trade_cash(model, int(position), mid),
+                                                                     rel=1e-12, abs=1e-9)
+    prices = model.settlement_price(POSITIONS, mid)
+    assert prices[POSITIONS == 0] == mid
+    np.testing.assert_allclose(prices[POSITIONS != 0], expected[POSITIONS != 0] / POSITIONS[POSITIONS != 0])
+    assert model.settlement_value(50, float("nan")) == 0.0
+
+
+def test_fines_match_loop():
+    expected = [20 * max(abs(int(position)) - 200, 0) * 3 for position in POSITIONS]
+    assert list(fines(POSITIONS, 200, 20, cycles=3)) == expected
+    path = POSITIONS[::-1]
+    running, totals = 0, []
+    for position in path:
+        running += 20 * max(abs(int(position)) - 200, 0)
+        totals.append(running)
+    assert list(cumulative_fines(path, 200, 20)) == totals
@@ -0,0 +1,42 @@
+"""
+Checks that the incremental indicators in signals.py give the same values as their batch_* versions, including on
+series with NaNs in them. Run with python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from signals import (RollingCorr, RollingStats, batch_rolling_corr, batch_rolling_mean,  # noqa: E402
+                     batch_rolling_var)
+
+
+def series_with_nans(length: int, num_series: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = 100 + rng.normal(size=(length, num_series)).cumsum(axis=0)
+    x[rng.random(x.shape) < 0.2] = np.nan
+    x[10:25, 0] = np.nan  # a gap longer than the window
+    return x
+
+
+def test_rolling_stats_match_batch():
+    x = series_with_nans(500, 3, seed=0)
+    stats = RollingStats(3, window=8)
+    means, variances = [], []
+    for row in x:
+        means.append(stats.update(row))
+        variances.append(stats.var)
+    np.testing.assert_allclose(means, batch_rolling_mean(x, 8), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(variances, batch_rolling_var(x, 8), rtol=1e-6, atol=1e-9)
+    assert np.isnan(means[24][0]) and not np.isnan(means[24][1:]).any()
+    assert not np.isnan(variances).any()
+
+
+def test_rolling_corr_matches_batch():
+    x, y = series_with_nans(500, 3, seed=1), series_with_nans(500, 3, seed=2)
+    corr = RollingCorr(3, window=8)
+    incremental = [corr.update(xi, yi).copy() for xi, yi in zip(x, y)]
+    np.testing.assert_allclose(incremental, batch_rolling_corr(x, y, 8), rtol=1e-6, atol=1e-9)
+    assert not np.isnan(incremental).any()
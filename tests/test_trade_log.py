@@ -0,0 +1,42 @@
+"""
+Checks that TradeLog gives back exactly the trades appended to it, order ids included, whether it keeps them all in
+memory, keeps only the last limit or spills them to disk. Run with python -m pytest tests
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base import Trade  # noqa: E402
+from trade_log import TradeLog  # noqa: E402
+
+
+def make_trades(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    order_ids = [50000000.0, 2 ** 60 + 1, "abc-1", 7]
+    return [Trade(round(100 + rng.randint(-20, 20) * 0.1, 1), rng.randint(1, 30), rng.choice(("UEC", "ABC")),
+                  rng.choice(order_ids), i, rng.choice(("Buy", "Sell")), rng.choice(("a", "b")), "c")
+            for i in range(n)]
+
+
+def fields(trade: Trade):
+    return (trade.price, trade.size, trade.ticker, trade.agg_order_id, type(trade.agg_order_id), trade.rest_order_id,
+            trade.agg_dir, trade.agg_bot, trade.rest_bot)
+
+
+@pytest.mark.parametrize("mode", ["memory", "limit", "spill"])
+def test_reads_back_what_was_appended(mode, tmp_path):
+    trades = make_trades(1000)
+    kwargs = {"limit": {"limit": 37}, "spill": {"spill_dir": str(tmp_path)}}.get(mode, {})
+    log = TradeLog(chunk_size=64, flush_size=50, **kwargs)
+    for i, trade in enumerate(trades):
+        log.append(trade)
+        if i % 333 == 0:
+            list(log)  # reads in between flushes
+    expected = trades[-37:] if mode == "limit" else trades
+    assert len(log) == len(expected)
+    assert [fields(t) for t in log] == [fields(t) for t in expected]
+    assert list(log.to_frame()["rest_order_id"]) == [t.rest_order_id for t in expected]
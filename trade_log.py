@@ -0,0 +1,219 @@
+import json
+import os
+import tempfile
+from operator import attrgetter
+from typing import Dict, List
+
+import numpy as np
+
+
+TRADE_DTYPE = np.dtype([
+    ("price", np.float64),
+    ("size", np.int64),
+    ("direction", np.int8),  # direction of the aggressor, 1 for Buy, -1 for Sell
+    ("ticker", np.int16),  # code into TradeLog.ticker_names
+    ("agg_order_id", object),  # order ids are kept exactly as the bots sent them (float, int, str, ...)
+    ("rest_order_id", object),
+    ("agg_bot", np.int32),  # code into TradeLog.bot_names
+    ("rest_bot", np.int32),
+    ("trade_time", np.float64),  # NaN unless Trade.record_time was on
+])
+NUMERIC_FIELDS = tuple(name for name in TRADE_DTYPE.names if not TRADE_DTYPE[name].hasobject)
+ORDER_ID_FIELDS = ("agg_order_id", "rest_order_id")
+
+
+class TradeLog:
+    """
+    Columnar store for executed trades, used as Exchange.trade_log.
+
+    Each field in TRADE_DTYPE gets its own preallocated NumPy array. Tickers and bot names are stored as small int
+    codes, order ids as references to the ids the bots sent. The arrays grow chunk_size rows at a time, so memory per
+    trade is ~60 bytes rather than a whole Trade object.
+
+    append only adds the Trade to a Python list, as the original list log did; they are written into the arrays
+    flush_size at a time (and before any read), a whole column at once, as NumPy is slow at setting single elements.
+
+    limit: keep only the most recent limit trades (a ring buffer), older ones are overwritten
+    spill_dir: once chunk_size trades are in memory, write them out as a .npy chunk and start again. Each log
+        writes to its own new subfolder of spill_dir (self.spill_dir), so exchanges sharing the setting never
+        overwrite each other's chunks. Everything logged can still be read back, the chunks on disk are
+        memory-mapped when read (apart from the order ids, which are pickled next to each chunk)
+
+    Reads (column, to_frame) are zero-copy views while all the trades are still in memory and the ring buffer has
+    not wrapped; otherwise they have to stitch the pieces together.
+    """
+    def __init__(self, chunk_size: int = 65536, limit: int = None, spill_dir: str = None, flush_size: int = 4096):
+        if limit is not None and spill_dir is not None:
+            raise ValueError("Choose either a retention limit or a spill_dir for the TradeLog, not both.")
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be a positive integer.")
+
+        self.chunk_size = chunk_size
+        self.flush_size = flush_size
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.capacity = limit if limit is not None else chunk_size
+        self.columns = {name: np.empty(self.capacity, dtype=TRADE_DTYPE[name]) for name in TRADE_DTYPE.names}
+        self.count = 0  # trades currently held in memory
+        self.start = 0  # index of the oldest trade in memory, only moves once the ring buffer is full
+        self.total = 0  # trades ever appended, including overwritten and spilled ones
+        self.pending = []  # Trades appended since the last flush
+        self.spilled_files = []
+
+        self.ticker_names = []
+        self.ticker_codes = {}  # ticker → code
+        self.bot_names = []
+        self.bot_codes = {}  # bot name → code
+
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="trade_log_", dir=spill_dir)
+
+    def append(self, trade) -> None:
+        self.pending.append(trade)
+        self.total += 1
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the pending trades into the column arrays, spilling, growing or wrapping around as needed
+        """
+        rows = self.pending
+        if not rows:
+            return
+        self.pending = []
+        if self.limit is not None:
+            rows = rows[-self.capacity:]  # anything older would be overwritten straight away
+        values = {name: list(map(attrgetter(name), rows)) for name in TRADE_DTYPE.names}
+        values["ticker"] = self._codes(values["ticker"], self.ticker_codes, self.ticker_names)
+        values["agg_bot"] = self._codes(values["agg_bot"], self.bot_codes, self.bot_names)
+        values["rest_bot"] = self._codes(values["rest_bot"], self.bot_codes, self.bot_names)
+        if values["trade_time"].count(None) == len(rows):  # Trade.record_time is off
+            values["trade_time"] = np.full(len(rows), np.nan)
+        for name in NUMERIC_FIELDS:
+            values[name] = np.array(values[name], dtype=TRADE_DTYPE[name])  # any other None trade_time becomes NaN
+
+        if self.limit is not None:
+            n = len(rows)
+            idx = (self.start + self.count + np.arange(n)) % self.capacity
+            for name in TRADE_DTYPE.names:
+                self.columns[name][idx] = values[name]
+            dropped = max(0, self.count + n - self.capacity)
+            self.start = (self.start + dropped) % self.capacity
+            self.count += n - dropped
+            return
+
+        done = 0
+        while done < len(rows):
+            if self.count == self.capacity:
+                if self.spill_dir is not None:
+                    self._spill()
+                else:
+                    self._grow()
+            take = min(self.capacity - self.count, len(rows) - done)
+            for name in TRADE_DTYPE.names:
+                self.columns[name][self.count:self.count + take] = values[name][done:done + take]
+            self.count += take
+            done += take
+
+    def spill(self) -> None:
+        """
+        Writes the trades held in memory out to a new .npy chunk in self.spill_dir and empties the in-memory buffer
+        """
+        if self.spill_dir is None:
+            raise ValueError("This TradeLog was not given a spill_dir.")
+        self.flush()
+        self._spill()
+
+    def _spill(self) -> None:
+        if self.count == 0:
+            return
+        chunk = np.empty(self.count, dtype=[(name, TRADE_DTYPE[name]) for name in NUMERIC_FIELDS])
+        for name in NUMERIC_FIELDS:
+            chunk[name] = self.columns[name][:self.count]
+        path = os.path.join(self.spill_dir, f"trades_{len(self.spilled_files):06d}.npy")
+        np.save(path, chunk)
+        order_ids = np.empty((len(ORDER_ID_FIELDS), self.count), dtype=object)
+        for row, name in enumerate(ORDER_ID_FIELDS):
+            order_ids[row] = self.columns[name][:self.count]
+        np.save(self._order_ids_path(path), order_ids, allow_pickle=True)
+        self.spilled_files.append(path)
+        with open(os.path.join(self.spill_dir, "names.json"), "w") as f:
+            json.dump({"tickers": self.ticker_names, "bots": self.bot_names}, f)
+        self.count = 0
+
+    @staticmethod
+    def _order_ids_path(path: str) -> str:
+        folder, file_name = os.path.split(path)
+        return os.path.join(folder, "order_ids_" + file_name[len("trades_"):])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns one field for every retrievable trade, oldest first
+        """
+        self.flush()
+        in_memory = self.columns[name]
+        if self.start + self.count <= self.capacity:
+            in_memory = in_memory[self.start:self.start + self.count]
+        else:
+            in_memory = np.concatenate((in_memory[self.start:], in_memory[:(self.start + self.count) % self.capacity]))
+        if not self.spilled_files:
+            return in_memory
+        if name in ORDER_ID_FIELDS:
+            row = ORDER_ID_FIELDS.index(name)
+            spilled = [np.load(self._order_ids_path(path), allow_pickle=True)[row] for path in self.spilled_files]
+        else:
+            spilled = [np.load(path, mmap_mode="r")[name] for path in self.spilled_files]
+        return np.concatenate(spilled + [in_memory])
+
+    def to_frame(self, decode: bool = True):
+        """
+        Returns the log as a pandas DataFrame with one column per field. With decode, tickers, bots and direction are
+        turned back into Categoricals of their names (the codes themselves are not copied)
+        """
+        import pandas as pd
+
+        data = {name: self.column(name) for name in TRADE_DTYPE.names}
+        if decode:
+            data["ticker"] = pd.Categorical.from_codes(data["ticker"], categories=self.ticker_names)
+            data["agg_bot"] = pd.Categorical.from_codes(data["agg_bot"], categories=self.bot_names)
+            data["rest_bot"] = pd.Categorical.from_codes(data["rest_bot"], categories=self.bot_names)
+            data["agg_dir"] = np.where(data.pop("direction") == 1, "Buy", "Sell")
+        return pd.DataFrame(data, copy=False)
+
+    def _grow(self) -> None:
+        self.capacity += self.chunk_size
+        for name in TRADE_DTYPE.names:
+            grown = np.empty(self.capacity, dtype=TRADE_DTYPE[name])
+            grown[:self.count] = self.columns[name][:self.count]
+            self.columns[name] = grown
+
+    @staticmethod
+    def _codes(column: List[str], codes: Dict[str, int], names: List[str]) -> List[int]:
+        for name in dict.fromkeys(column):  # new names get codes in the order they first traded
+            if name not in codes:
+                codes[name] = len(names)
+                names.append(name)
+        return list(map(codes.__getitem__, column))
+
+    def __len__(self):
+        if self.limit is None:
+            return self.total
+        return min(self.count + len(self.pending), self.capacity)
+
+    def __iter__(self):
+        """
+        Rebuilds Trade objects for code that still wants to loop over the log
+        """
+        from base import DIRECTION_NAMES, Trade
+
+        cols = {name: self.column(name) for name in TRADE_DTYPE.names}
+        for i in range(len(cols["price"])):
+            trade = Trade(float(cols["price"][i]), int(cols["size"][i]), self.ticker_names[cols["ticker"][i]],
+                          cols["agg_order_id"][i], cols["rest_order_id"][i],
+                          DIRECTION_NAMES[int(cols["direction"][i])],
+                          self.bot_names[cols["agg_bot"][i]], self.bot_names[cols["rest_bot"][i]])
+            trade_time = float(cols["trade_time"][i])
+            trade.trade_time = None if np.isnan(trade_time) else trade_time
+            yield trade
@@ -2,12 +2,22 @@ from base import Exchange, Trade, Order, Product, Msg, Rest
 from typing import List, Dict
 import numpy as np
 from collections import deque
-import numpy as np
-from typing import Dict, List
 
 
 class PlayerAlgorithm:
-    def __init__(self, products): 
+    # Tunable settings. PlayerAlgorithm(products, order_size=8) overrides them for one bot (used by sweep.py)
+    default_params = {
+        "order_size": 5,  # size of each order
+        "rolling_window_size": 50,  # turns in the rolling correlation
+        "max_pos": 200,  # no new orders past this predicted position
+        "cancel_pos": 195,  # open orders are pulled once the predicted position reaches this
+    }
+
+    def __init__(self, products, **params):
+        unknown = set(params) - set(self.default_params)
+        if unknown:
+            raise ValueError(f"Unknown PlayerAlgorithm parameters: {sorted(unknown)}")
+        self.params = {**self.default_params, **params}
         self.products = products
         self.name = "TT5"
         self.team_members = ["Nick", "Chelsea"]
@@ -25,18 +35,13 @@ class PlayerAlgorithm:
         # Market data history
         self.bids = {p.ticker: [] for p in products}
         self.asks = {p.ticker: [] for p in products}
-        self.mid_prices = {p.ticker: deque(maxlen=1000) for p in products}
-        self.momentum = {p.ticker: deque(maxlen=1000) for p in products}
-        self.rolling_corr = {p.ticker: deque(maxlen=1000) for p in products}
-
-        # Rolling correlation incremental sums
-        self.rolling_window_size = 50
-        self.rolling_window = {p.ticker: deque(maxlen=self.rolling_window_size) for p in products}
-        self.rolling_sum_x = {p.ticker: 0.0 for p in products}
-        self.rolling_sum_y = {p.ticker: 0.0 for p in products}
-        self.rolling_sum_x2 = {p.ticker: 0.0 for p in products}
-        self.rolling_sum_y2 = {p.ticker: 0.0 for p in products}
-        self.rolling_sum_xy = {p.ticker: 0.0 for p in products}
+        self.mid_prices = {p.ticker: None for p in products}  # latest mid, None if a side of the book was empty
+
+        # Rolling correlation from incremental sums. Plain floats per ticker: with the game's single ticker these
+        # are far cheaper per turn than NumPy calls (signals.py has vectorised versions for many tickers)
+        self.rolling_window_size = self.params["rolling_window_size"]
+        self.rolling_window = {p.ticker: deque() for p in products}
+        self.rolling_sums = {p.ticker: [0.0, 0.0, 0.0, 0.0, 0.0] for p in products}  # x, y, x², y², xy
 
     def process_trades(self, trades: List[Trade]) -> None:
         for trade in trades:
@@ -58,83 +63,72 @@ class PlayerAlgorithm:
                 if order_info['size'] <= 0:
                     del self.open_orders[order_id]
 
+    def update_corr(self, ticker: str, x_new: float, y_new: float) -> float:
+        """
+        Adds (x_new, y_new) to the ticker's rolling window and returns the window's correlation (0 until it has two
+        points or while either series is flat)
+        """
+        window = self.rolling_window[ticker]
+        sums = self.rolling_sums[ticker]
+        if len(window) == self.rolling_window_size:
+            x_old, y_old = window.popleft()
+            sums[0] -= x_old
+            sums[1] -= y_old
+            sums[2] -= x_old ** 2
+            sums[3] -= y_old ** 2
+            sums[4] -= x_old * y_old
+        window.append((x_new, y_new))
+        sums[0] += x_new
+        sums[1] += y_new
+        sums[2] += x_new ** 2
+        sums[3] += y_new ** 2
+        sums[4] += x_new * y_new
+
+        n = len(window)
+        if n < 2:
+            return 0.0
+        sum_x, sum_y, sum_x2, sum_y2, sum_xy = sums
+        denominator = max((n * sum_x2 - sum_x ** 2) * (n * sum_y2 - sum_y ** 2), 0.0) ** 0.5
+        return (n * sum_xy - sum_x * sum_y) / denominator if denominator != 0 else 0.0
+
     def getMyPosition(self, ticker: str) -> int:
         return self.positions.get(ticker, 0)
 
+    # Optional: define process_deltas and, just before each send_messages, it is handed every add/cancel/fill
+    # (base.BookDelta) since your last turn, so you can update your own state from what changed. The full book is
+    # still passed to send_messages as usual.
+    # def process_deltas(self, deltas: List["BookDelta"]) -> None:
+    #     for delta in deltas:
+    #         ...
+
     def send_messages(self, book: Dict[str, Dict[str, List["Rest"]]]) -> List["Msg"]:
         messages = []
-        window = 50
-        order_size = 5
+        order_size = self.params["order_size"]
+        max_pos = self.params["max_pos"]
+        cancel_pos = self.params["cancel_pos"]
         mpv = 0.1  # minimum price variation (tick size)
         
         for ticker in book:
-        # --- Extract top-of-book prices ---
-            best_bid = book[ticker]["Bids"][0].price if book[ticker]["Bids"] else None
-            best_ask = book[ticker]["Asks"][0].price if book[ticker]["Asks"] else None
-
         # --- Mid price calculation ---
-            if best_bid is not None and best_ask is not None:
-                new_mid = (best_bid + best_ask) / 2
+            bids, asks = book[ticker]["Bids"], book[ticker]["Asks"]
+            if bids and asks:
+                new_mid = (bids[0].price + asks[0].price) / 2
                 mid_price_rounded = round(new_mid / mpv) * mpv
             else:
                 new_mid = None
                 mid_price_rounded = None
 
-        # --- Append mid price ---
-            self.mid_prices[ticker].append(new_mid)
-
-        # --- Momentum calculation ---
-            if len(self.mid_prices[ticker]) >= 2:
-                m = self.mid_prices[ticker][-1] - self.mid_prices[ticker][-2] \
-                    if self.mid_prices[ticker][-1] is not None and self.mid_prices[ticker][-2] is not None else 0
-                self.momentum[ticker].append(m)
-            else:
-                self.momentum[ticker].append(0)
-
-        # --- Rolling correlation calculation ---
-            # --- Rolling correlation calculation (incremental) ---
-            x_new = self.momentum[ticker][-1]
-            if len(self.mid_prices[ticker]) >= 2 and self.mid_prices[ticker][-1] is not None and self.mid_prices[ticker][-2] is not None:
-                y_new = self.mid_prices[ticker][-1] - self.mid_prices[ticker][-2]
-            else:
-                y_new = 0.0
-
-            window_deque = self.rolling_window[ticker]
-
-# Remove oldest values if deque is full
-            if len(window_deque) == self.rolling_window_size:
-                 x_old, y_old = window_deque.popleft()
-                 self.rolling_sum_x[ticker] -= x_old
-                 self.rolling_sum_y[ticker] -= y_old
-                 self.rolling_sum_x2[ticker] -= x_old**2
-                 self.rolling_sum_y2[ticker] -= y_old**2
-                 self.rolling_sum_xy[ticker] -= x_old * y_old
-
-# Add new values
-            window_deque.append((x_new, y_new))
-            self.rolling_sum_x[ticker] += x_new
-            self.rolling_sum_y[ticker] += y_new
-            self.rolling_sum_x2[ticker] += x_new**2
-            self.rolling_sum_y2[ticker] += y_new**2
-            self.rolling_sum_xy[ticker] += x_new * y_new
-
-# Compute correlation
-            n = len(window_deque)
-            if n > 1:
-                 numerator = n*self.rolling_sum_xy[ticker] - self.rolling_sum_x[ticker]*self.rolling_sum_y[ticker]
-                 denominator = ((n*self.rolling_sum_x2[ticker] - self.rolling_sum_x[ticker]**2) *
-                                (n*self.rolling_sum_y2[ticker] - self.rolling_sum_y[ticker]**2))**0.5
-                 corr = numerator / denominator if denominator != 0 else 0
-            else:
-                 corr = 0
-            self.rolling_corr[ticker].append(corr)
-
-    
+        # --- Momentum: the mid change since last turn, 0 when either mid was missing ---
+            last_mid = self.mid_prices[ticker]
+            momentum = new_mid - last_mid if new_mid is not None and last_mid is not None else 0.0
+            self.mid_prices[ticker] = new_mid
 
+        # --- Rolling correlation of momentum with the price change (the same series here) ---
+            corr = self.update_corr(ticker, momentum, momentum)
 
         # --- Trading signal ---
-            last_momentum = self.momentum[ticker][-1]
-            last_corr = self.rolling_corr[ticker][-1]
+            last_momentum = momentum
+            last_corr = corr
             position_signal = 0
             if last_momentum > 0 and last_corr > 0:
                 position_signal = 1  # buy
@@ -145,8 +139,7 @@ class PlayerAlgorithm:
             if mid_price_rounded is not None:
                 real_pos=self.getMyPosition(ticker)
 
-                max_pos = 200
-                min_pos = -200
+                min_pos = -max_pos
 
                 if position_signal == 1: 
                     allowed_size = min(order_size, max_pos -self.predicted_positions[ticker] )
@@ -157,14 +150,14 @@ class PlayerAlgorithm:
 
                 projected_pos = real_pos + self.predicted_positions[ticker]
 
-                if position_signal == 1 and projected_pos <200: #allowed_size 
+                if position_signal == 1 and projected_pos < max_pos: #allowed_size 
                     
                     if allowed_size > 0:
                         self.predicted_positions[ticker] += allowed_size
                         msg, order_id = self.create_order(ticker, allowed_size, mid_price_rounded, "Buy")   
                         messages.append(msg)                    
                         self.open_orders[order_id] = {"ticker": ticker,"direction": "Buy",  "size": allowed_size}
-                elif position_signal == -1 and projected_pos>-200: #allowed_size 
+                elif position_signal == -1 and projected_pos > min_pos: #allowed_size 
                     
                     if allowed_size > 0:
                         self.predicted_positions[ticker] -= allowed_size
@@ -177,13 +170,12 @@ class PlayerAlgorithm:
                 direction = order_info["direction"]
                 size = order_info["size"]
                 price = order_info.get("price", None)
-                mid = self.mid_prices[ticker2][-1]
 
-                if self.predicted_positions[ticker2] >= 195 and direction == "Buy":
+                if self.predicted_positions[ticker2] >= cancel_pos and direction == "Buy":
                     messages.append(self.remove_order(order_id))
                     self.predicted_positions[ticker2] -= size
                     del self.open_orders[order_id]
-                elif self.predicted_positions[ticker2] <= -195 and direction == "Sell":
+                elif self.predicted_positions[ticker2] <= -cancel_pos and direction == "Sell":
                     messages.append(self.remove_order(order_id))
                     self.predicted_positions[ticker2] += size
                     del self.open_orders[order_id]  